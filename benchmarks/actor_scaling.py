@@ -0,0 +1,50 @@
+"""Env and update throughput of drl.distributed.train_distributed per actor count.
+
+The actors run without the replay-ratio limit, so env steps/sec measures how fast the
+actors fill the shared ring while the learner trains at the same time. Throughput can
+only grow with the actor count while there are idle cores for the extra actors.
+
+Run from the repository root:
+
+    python -m benchmarks.actor_scaling --actors 1 2 4 --episodes 300
+"""
+import argparse
+import os
+
+import gymnasium as gym
+import torch
+
+from drl.agents import CAgent
+from drl.distributed import train_distributed
+from drl.models import DQN3Layers
+from drl.profiling import PhaseTimer
+
+
+def measure(num_actors, episodes, batch_size, seed=0):
+    torch.manual_seed(seed)
+    env = gym.make("CartPole-v1")
+    agent = CAgent(env, DQN3Layers(4, 2), learning_rate=1e-3, initial_epsilon=1.0, epsilon_decay=0.01,
+                   final_epsilon=0.01, discount_factor=0.99)
+    timer = PhaseTimer()
+    train_distributed(agent, episodes, batch_size, 2, num_actors=num_actors, timer=timer, seed=seed,
+                      evaluator=lambda agent: [0.0], max_lead=None)
+    return timer.counters["env_steps"], timer.counters["updates"], timer.summary().splitlines()[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--actors", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--episodes", type=int, default=300)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    print(f"{os.cpu_count()} cores")
+    measure(1, 1, args.batch_size)  # starts the fork server, which the runs below reuse
+    for num_actors in args.actors:
+        env_steps, updates, throughput = measure(num_actors, args.episodes, args.batch_size)
+        print(f"{num_actors} actors: {env_steps} env steps, {updates} updates; {throughput}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Training throughput of an EnsembleAgent against separate CAgents.
+
+Both sides train M members on full replay memories of random CartPole-shaped
+transitions. The separate agents run one after another in this process, which is
+what M single-threaded sweep processes get from one core; on a machine with M free
+cores the separate processes would instead run side by side.
+
+Run from the repository root:
+
+    python -m benchmarks.ensemble_throughput --members 4 12 --batch-size 1024
+"""
+import argparse
+import time
+
+import gymnasium as gym
+import numpy as np
+import torch
+
+from drl.agents import CAgent
+from drl.ensemble import EnsembleAgent
+from drl.models import MODELS
+
+
+def fill(memory, rng, n=10000):
+    memory.extend(rng.standard_normal((n, 4)).astype(np.float32), rng.integers(0, 2, n),
+                  np.ones(n, dtype=np.float32), rng.standard_normal((n, 4)).astype(np.float32),
+                  (rng.random(n) < 0.05).astype(np.float32))
+
+
+def measure(model_name, members, batch_size, steps, seed=0):
+    torch.manual_seed(seed)
+    rng = np.random.default_rng(seed)
+    env = gym.make("CartPole-v1")
+    model_class = MODELS[model_name]
+    learning_rates = list(np.geomspace(1e-4, 1e-2, members))
+
+    agents = [CAgent(env, model_class(4, 2), learning_rate, 1.0, 0.1, 0.01, 0.99) for learning_rate in learning_rates]
+    for agent in agents:
+        fill(agent.replay_memory, rng)
+    ensemble = EnsembleAgent(model_class, 4, 2, learning_rates, [0.1] * members, [0.99] * members)
+    for memory in ensemble.replay_memories:
+        fill(memory, rng)
+    states = rng.standard_normal((members, 4)).astype(np.float32)
+
+    for agent in agents:
+        agent.train_on_batch(batch_size)
+    ensemble.train_on_batch(batch_size)
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        for agent, state in zip(agents, states):
+            agent.sample_action(state)
+            agent.train_on_batch(batch_size)
+    separate = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        ensemble.sample_actions(states)
+        ensemble.train_on_batch(batch_size)
+    batched = time.perf_counter() - start
+    return members * steps / separate, members * steps / batched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", nargs="+", default=["DQN3Layers", "DQN5Layers"])
+    parser.add_argument("--members", type=int, nargs="+", default=[4, 12])
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--steps", type=int, default=50)
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    print(f"{'model':<12}{'members':>8}{'separate/s':>12}{'ensemble/s':>12}{'speedup':>9}")
+    for model_name in args.models:
+        for members in args.members:
+            separate, batched = measure(model_name, members, args.batch_size, args.steps)
+            print(f"{model_name:<12}{members:>8}{separate:>12.1f}{batched:>12.1f}{batched / separate:>8.1f}x")
+    print("member updates per second, each with one action")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""Microbenchmarks of the per-step hot paths: replay writes and samples, acting and updates.
+
+Measures CAgent.store_experience / sample_batch / sample_action / train_on_batch and the
+add / sample / update_priority methods of both prioritized replay buffers, over a grid
+of buffer sizes and batch sizes, with fixed seeds and synthetic CartPole-shaped
+transitions. Results are written to a JSON file; --baseline compares them with an
+earlier file and exits with status 1 if anything got slower than --threshold allows.
+
+Run from the repository root:
+
+    python -m benchmarks.hot_paths --output before.json
+    python -m benchmarks.hot_paths --output after.json --baseline before.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+import torch
+
+from drl.replay import ArrayReplayBuffer, SumTreeReplayBuffer, prioritized_replay_buffer
+
+STATE_SIZE = 4
+
+
+def timed(fn, min_time=0.2, min_calls=3):
+    """Mean seconds per call of fn, calling it until both min_time and min_calls are reached."""
+    calls = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        calls += 1
+        elapsed = time.perf_counter() - start
+        if calls >= min_calls and elapsed >= min_time:
+            return elapsed / calls
+
+
+def transitions(rng, n):
+    states = rng.standard_normal((n, STATE_SIZE)).astype(np.float32)
+    next_states = rng.standard_normal((n, STATE_SIZE)).astype(np.float32)
+    return states, rng.integers(2, size=n), np.ones(n, dtype=np.float32), next_states, rng.random(n) < 0.05
+
+
+def filled_array_buffer(size, rng):
+    buffer = ArrayReplayBuffer(size, (STATE_SIZE,))
+    buffer.extend(*transitions(rng, size))
+    return buffer
+
+
+def filled_per_buffer(buffer_cls, size, rng):
+    # filled through the internals, since the list buffer would take hours to fill to 1M with add()
+    columns = transitions(rng, size)
+    priorities = (rng.random(size) + 1e-6) ** 0.2
+    buffer = buffer_cls(max_size=size)
+    if buffer_cls is prioritized_replay_buffer:
+        buffer.exp_buffer = list(zip(*columns))
+        buffer.error_buffer = priorities.tolist()
+    else:
+        buffer.storage = ArrayReplayBuffer(size, (STATE_SIZE,))
+        buffer.storage.extend(*columns)
+        buffer.tree.update(np.arange(size), priorities)
+        buffer.position, buffer.size = buffer.storage.position, size
+    return buffer
+
+
+def make_agent(model_name):
+    import gymnasium as gym
+
+    from drl.agents import CAgent
+    from drl.models import MODELS
+
+    # epsilon 0, so sample_action always takes the greedy forward pass
+    return CAgent(gym.make("CartPole-v1"), MODELS[model_name](STATE_SIZE, 2), learning_rate=1e-3,
+                  initial_epsilon=0.0, epsilon_decay=0.0, final_epsilon=0.0, discount_factor=0.95)
+
+
+def run_suite(sizes, batch_sizes, models, min_time, seed=0):
+    rng = np.random.default_rng(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+    records = []
+
+    def record(benchmark, seconds, **params):
+        records.append(dict(benchmark=benchmark, **params, us_per_call=1e6 * seconds, calls_per_sec=1 / seconds))
+        params_text = "  ".join(f"{key}={value}" for key, value in params.items())
+        print(f"{benchmark:<22}{params_text:<60}{1e6 * seconds:>12.1f} us")
+
+    agents = {model_name: make_agent(model_name) for model_name in models}
+    experience = tuple(column[0] for column in transitions(rng, 1))
+    states = transitions(rng, 1000)[0]
+
+    for model_name, agent in agents.items():
+        state_iter = iter(np.resize(states, (10 ** 6, STATE_SIZE)))
+        record("sample_action", timed(lambda: agent.sample_action(next(state_iter)), min_time), model=model_name)
+
+    for size in sizes:
+        agent = agents[models[0]]
+        agent.replay_memory = filled_array_buffer(size, rng)
+        record("store_experience", timed(lambda: agent.store_experience(experience), min_time), buffer_size=size)
+        for batch_size in batch_sizes:
+            record("sample_batch", timed(lambda: agent.sample_batch(batch_size), min_time),
+                   buffer_size=size, batch_size=batch_size)
+            for model_name, other in agents.items():
+                other.replay_memory = agent.replay_memory
+                record("train_on_batch", timed(lambda: other.train_on_batch(batch_size), min_time),
+                       model=model_name, buffer_size=size, batch_size=batch_size)
+
+        for buffer_cls in (prioritized_replay_buffer, SumTreeReplayBuffer):
+            buffer = filled_per_buffer(buffer_cls, size, rng)
+            impl = buffer_cls.__name__
+            record("per_add", timed(lambda: buffer.add(experience, 1.0), min_time), impl=impl, buffer_size=size)
+            for batch_size in batch_sizes:
+                record("per_sample", timed(lambda: buffer.sample(batch_size), min_time),
+                       impl=impl, buffer_size=size, batch_size=batch_size)
+                _, indices, _ = buffer.sample(batch_size)
+                errors = rng.random(batch_size)
+                record("per_update_priority", timed(lambda: buffer.update_priority(indices, errors), min_time),
+                       impl=impl, buffer_size=size, batch_size=batch_size)
+    return records
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "torch": torch.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+    }
+
+
+def _key(record):
+    return tuple(sorted((key, value) for key, value in record.items() if key not in ("us_per_call", "calls_per_sec")))
+
+
+def compare(records, baseline, threshold):
+    """Print the slowdown of every measurement present in both runs and return the regressions."""
+    old = {_key(record): record["us_per_call"] for record in baseline}
+    regressions = []
+    print(f"\n{'ratio':>8}  measurement (new / baseline time)")
+    for record in records:
+        if _key(record) not in old:
+            continue
+        ratio = record["us_per_call"] / old[_key(record)]
+        slower = ratio > 1 + threshold
+        if slower:
+            regressions.append(record)
+        params = ", ".join(f"{key}={value}" for key, value in _key(record))
+        print(f"{ratio:>8.2f}  {params}{'  SLOWER' if slower else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[32, 256, 2048])
+    parser.add_argument("--models", nargs="+", default=["DQN3Layers", "DQN5Layers"])
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds spent on each measurement")
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads")
+    parser.add_argument("--output", default=os.path.join("runs", "benchmarks", "hot_paths.json"))
+    parser.add_argument("--baseline", default=None, help="earlier output file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="relative slowdown reported as a regression")
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+
+    records = run_suite(args.sizes, args.batch_sizes, args.models, args.min_time)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump({"environment": environment(), "results": records}, f, indent=1)
+    print(f"wrote {args.output}")
+
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        if compare(records, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Acting latency of the torch DQN forward pass and its NumPy mirror.
+
+Run from the repository root:
+
+    python -m benchmarks.inference_latency --layers 3 5 --calls 20000
+"""
+import argparse
+import time
+
+import numpy as np
+import torch
+from torch import nn
+
+from drl.inference import NumpyPolicy
+
+
+def make_mlp(hidden_layers, state_size=4, action_size=2, width=32):
+    """Same shape as DQN3Layers/DQN5Layers."""
+    layers = [nn.Linear(state_size, width), nn.ReLU()]
+    for _ in range(hidden_layers - 1):
+        layers += [nn.Linear(width, width), nn.ReLU()]
+    return nn.Sequential(*layers, nn.Linear(width, action_size))
+
+
+def torch_act(model, state):
+    # the pre-mirror CAgent.sample_action path
+    state_tensor = torch.FloatTensor(state).unsqueeze(0)
+    with torch.no_grad():
+        return torch.argmax(model(state_tensor)).item()
+
+
+def measure(hidden_layers, calls, batch_size, seed=0):
+    torch.manual_seed(seed)
+    rng = np.random.default_rng(seed)
+    model = make_mlp(hidden_layers)
+    policy = NumpyPolicy(model)
+    states = rng.standard_normal((calls, 4)).astype(np.float32)
+
+    start = time.perf_counter()
+    torch_actions = [torch_act(model, state) for state in states]
+    torch_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    numpy_actions = [policy.act(state) for state in states]
+    numpy_time = time.perf_counter() - start
+
+    batch = states[:batch_size]
+    with torch.no_grad():
+        torch_batch = torch.argmax(model(torch.from_numpy(batch)), dim=1).numpy()
+
+    return {
+        "torch_us": 1e6 * torch_time / calls,
+        "numpy_us": 1e6 * numpy_time / calls,
+        "agreement": np.mean(np.array(torch_actions) == np.array(numpy_actions)),
+        "batch_agreement": np.mean(torch_batch == policy.act_batch(batch)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--layers", type=int, nargs="+", default=[3, 5])
+    parser.add_argument("--calls", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    print(f"{'model':<12}{'torch us':>10}{'numpy us':>10}{'speedup':>9}{'agree':>8}{'batch agree':>13}")
+    for hidden_layers in args.layers:
+        result = measure(hidden_layers, args.calls, args.batch_size)
+        print(f"{f'{hidden_layers} layers':<12}{result['torch_us']:>10.1f}{result['numpy_us']:>10.1f}"
+              f"{result['torch_us'] / result['numpy_us']:>8.1f}x{result['agreement']:>8.3f}"
+              f"{result['batch_agreement']:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
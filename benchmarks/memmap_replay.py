@@ -0,0 +1,90 @@
+"""Peak resident memory and sampling speed of the in-memory and memory-mapped replay buffers.
+
+Every measurement runs in a fresh process: it fills a CartPole-shaped buffer of the given
+capacity, then samples batches for a small DQN training loop. The peak resident set
+(VmHWM) above the process's baseline grows with capacity for ArrayReplayBuffer and stays
+near the ResidentBudget for MemmapReplayBuffer. The same runs without --no-prefetch
+compare sampling on the training thread with prefetching on a background thread.
+
+Run from the repository root (Linux, for /proc/self/status):
+
+    python -m benchmarks.memmap_replay --capacities 100000 1000000 10000000 --dir /tmp/replay
+"""
+import argparse
+import multiprocessing
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def _status_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1])
+
+
+def measure(backend, capacity, directory, batches, batch_size, budget_mb, prefetch):
+    import torch
+
+    from drl.models import DQN5Layers
+    from drl.replay import ArrayReplayBuffer, MemmapReplayBuffer, ResidentBudget
+
+    torch.set_num_threads(1)
+    model = DQN5Layers(4, 2)
+    optimizer = torch.optim.Adam(model.parameters())
+    baseline = _status_kb("VmRSS")
+    if backend == "array":
+        buffer = ArrayReplayBuffer(capacity, (4,))
+    else:
+        buffer = MemmapReplayBuffer(capacity, (4,), directory, budget=ResidentBudget(budget_mb << 20),
+                                    prefetch=prefetch)
+
+    chunk = 100_000
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    for filled in range(0, capacity, chunk):
+        n = min(chunk, capacity - filled)
+        states = rng.random((n, 4), dtype=np.float32)
+        buffer.extend(states, rng.integers(0, 2, n), np.ones(n, dtype=np.float32), states, np.zeros(n, np.float32))
+    fill_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(batches):
+        states, actions, rewards, next_states, dones = (torch.from_numpy(column) for column in buffer.sample(batch_size))
+        loss = (model(states).gather(1, actions.unsqueeze(1)).squeeze(1) - rewards).pow(2).mean()
+        optimizer.zero_grad()
+        loss.backward()
+        optimizer.step()
+    train_time = time.perf_counter() - start
+    return (_status_kb("VmHWM") - baseline) / 1024, fill_time, train_time / batches * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capacities", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--dir", default="replay_benchmark", help="directory for the memory-mapped columns")
+    parser.add_argument("--batches", type=int, default=500)
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--budget-mb", type=int, default=64)
+    parser.add_argument("--no-prefetch", action="store_true", help="also measure the memmap buffer without prefetch")
+    args = parser.parse_args()
+
+    backends = [("array", True), ("memmap", True)] + ([("memmap", False)] if args.no_prefetch else [])
+    context = multiprocessing.get_context("spawn")
+    print(f"batch {args.batch_size}, budget {args.budget_mb} MiB")
+    for capacity in args.capacities:
+        for backend, prefetch in backends:
+            with ProcessPoolExecutor(1, mp_context=context) as pool:
+                peak_mb, fill_time, step_ms = pool.submit(measure, backend, capacity, args.dir, args.batches,
+                                                          args.batch_size, args.budget_mb, prefetch).result()
+            name = backend if backend == "array" else f"memmap{'' if prefetch else ' (no prefetch)'}"
+            print(f"{capacity:>10} {name:<22} peak RSS +{peak_mb:7.1f} MiB, fill {fill_time:5.2f} s, "
+                  f"{step_ms:.2f} ms per sampled training step")
+    shutil.rmtree(args.dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
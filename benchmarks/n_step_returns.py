@@ -0,0 +1,99 @@
+"""Env steps and wall time until CartPole DQN is solved, for n-step and Double DQN targets.
+
+Each variant trains a CAgent with drl.training.train_agent from the same seeds and
+stops at the first evaluation (every 50 episodes, 100 greedy episodes) whose mean
+reward exceeds 475, the first_time_passed criterion of the sweeps. Runs that never
+get there within --episodes count as unsolved.
+
+Run from the repository root:
+
+    python -m benchmarks.n_step_returns --n-steps 1 3 5 --double --seeds 0 1 2
+"""
+import argparse
+import time
+
+import gymnasium as gym
+import numpy as np
+import torch
+
+from drl.agents import CAgent
+from drl.evaluation import BatchedEvaluator
+from drl.models import MODELS
+from drl.sweep import seed_everything
+from drl.training import train_agent
+
+
+class _Solved(Exception):
+    pass
+
+
+class SolveTracker:
+    """Metrics sink that records the first solving evaluation and ends the run there."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.env_steps = None
+        self.wall_time = None
+        self.episode = None
+
+    def log(self, metrics, episode=None):
+        if metrics.get("test_reward", 0) > 475:
+            self.env_steps = metrics["env_steps"]
+            self.wall_time = time.perf_counter() - self.start
+            self.episode = episode
+            raise _Solved
+
+    def close(self):
+        pass
+
+
+def solve(n_step, double_dqn, seed, args):
+    seed_everything(seed)
+    env = gym.make("CartPole-v1")
+    env.reset(seed=seed)
+    env.action_space.seed(seed)
+    evaluator = BatchedEvaluator("CartPole-v1", episodes=100)
+    evaluator.seed(seed)
+    agent = CAgent(env, MODELS[args.model](4, 2), learning_rate=args.learning_rate, initial_epsilon=1.0,
+                   epsilon_decay=args.epsilon_decay, final_epsilon=0.01, discount_factor=args.discount_factor,
+                   n_step=n_step, double_dqn=double_dqn)
+    tracker = SolveTracker()
+    try:
+        train_agent(env, agent, args.episodes, args.batch_size, 2, metrics=tracker, evaluator=evaluator)
+    except _Solved:
+        pass
+    return tracker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n-steps", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--double", action="store_true", help="also run every n with Double DQN targets")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--episodes", type=int, default=600, help="episode cap per run")
+    parser.add_argument("--model", default="DQN3Layers")
+    parser.add_argument("--learning-rate", type=float, default=1e-3)
+    parser.add_argument("--epsilon-decay", type=float, default=0.01)
+    parser.add_argument("--discount-factor", type=float, default=0.99)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    variants = [(n_step, False) for n_step in args.n_steps]
+    if args.double:
+        variants += [(n_step, True) for n_step in args.n_steps]
+    print(f"{'variant':<16}{'solved':>8}{'episode':>9}{'env steps':>11}{'wall s':>9}   (medians over solved seeds)")
+    for n_step, double_dqn in variants:
+        runs = [solve(n_step, double_dqn, seed, args) for seed in args.seeds]
+        solved = [run for run in runs if run.env_steps is not None]
+        name = f"{n_step}-step" + (" double" if double_dqn else "")
+        if solved:
+            print(f"{name:<16}{len(solved):>5}/{len(runs):<2}{np.median([run.episode for run in solved]):>9.0f}"
+                  f"{np.median([run.env_steps for run in solved]):>11.0f}"
+                  f"{np.median([run.wall_time for run in solved]):>9.1f}")
+        else:
+            print(f"{name:<16}{0:>5}/{len(runs):<2}{'-':>9}{'-':>11}{'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Throughput comparison of the list-based and sum-tree prioritized replay buffers.
+
+Run from the repository root:
+
+    python -m benchmarks.replay_throughput --sizes 10000 100000 --batch-size 1024
+"""
+import argparse
+import time
+
+import numpy as np
+
+from drl.replay import SumTreeReplayBuffer, prioritized_replay_buffer
+
+
+def fake_experience(rng):
+    state = rng.standard_normal(4).astype(np.float32)
+    next_state = rng.standard_normal(4).astype(np.float32)
+    return state, int(rng.integers(2)), 1.0, next_state, False
+
+
+def measure(buffer_cls, size, batch_size, train_steps, seed=0):
+    rng = np.random.default_rng(seed)
+    np.random.seed(seed)
+    buffer = buffer_cls(max_size=size)
+
+    start = time.perf_counter()
+    for _ in range(size):
+        buffer.add(fake_experience(rng), 1.0)
+    fill_time = time.perf_counter() - start
+
+    # steady state: one insert, one sample and one priority update per env step, as in train_agentIS
+    experience = fake_experience(rng)
+    start = time.perf_counter()
+    for _ in range(train_steps):
+        buffer.add(experience, 1.0)
+        _, indices, _ = buffer.sample(batch_size)
+        buffer.update_priority(indices, rng.random(batch_size))
+    step_time = time.perf_counter() - start
+
+    return {
+        "adds_per_sec": size / fill_time,
+        "train_steps_per_sec": train_steps / step_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--batch-size", type=int, default=1024)
+    parser.add_argument("--train-steps", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'buffer':<28}{'size':>10}{'adds/s':>14}{'train steps/s':>16}")
+    for size in args.sizes:
+        for buffer_cls in (prioritized_replay_buffer, SumTreeReplayBuffer):
+            result = measure(buffer_cls, size, args.batch_size, args.train_steps)
+            print(f"{buffer_cls.__name__:<28}{size:>10}{result['adds_per_sec']:>14.0f}"
+                  f"{result['train_steps_per_sec']:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Episodes played and decisions of SequentialEvaluator against the full 100-episode evaluation.
+
+A CAgent is trained on CartPole and its greedy policy is snapshotted every --every
+episodes, giving policies from hopeless to solved. Every snapshot is evaluated
+--trials times by BatchedEvaluator (100 episodes) and by SequentialEvaluator, each
+trial with a new seed, and the mean > 475 decisions are compared.
+
+Run from the repository root:
+
+    python -m benchmarks.sequential_evaluation --episodes 300 --every 25 --trials 10 --rounds 20 80
+"""
+import argparse
+import copy
+import time
+import types
+
+import gymnasium as gym
+import numpy as np
+import torch
+
+from drl.agents import CAgent
+from drl.evaluation import BatchedEvaluator, SequentialEvaluator
+from drl.inference import NumpyPolicy
+from drl.models import DQN3Layers
+from drl.sweep import seed_everything
+from drl.training import train_agent
+
+
+def snapshots(episodes, every, seed=0):
+    seed_everything(seed)
+    env = gym.make("CartPole-v1")
+    env.reset(seed=seed)
+    env.action_space.seed(seed)
+    agent = CAgent(env, DQN3Layers(4, 2), learning_rate=1e-3, initial_epsilon=1.0, epsilon_decay=0.01,
+                   final_epsilon=0.01, discount_factor=0.99, n_step=3)
+    policies = []
+    for episode in range(0, episodes, every):
+        train_agent(env, agent, every, 64, 2, evaluator=lambda agent: [0.0])
+        policy = NumpyPolicy(copy.deepcopy(agent.model))
+        policies.append((episode + every, types.SimpleNamespace(test_actions=policy.act_batch)))
+    return policies
+
+
+def timed(evaluator, policy):
+    start = time.perf_counter()
+    rewards = evaluator(policy)
+    return np.mean(rewards) > 475, len(rewards), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--episodes", type=int, default=300, help="training episodes")
+    parser.add_argument("--every", type=int, default=25, help="episodes between snapshots")
+    parser.add_argument("--trials", type=int, default=10, help="evaluations per snapshot and evaluator")
+    parser.add_argument("--delta", type=float, default=0.05)
+    parser.add_argument("--rounds", type=int, nargs="+", default=[20, 80], help="episodes per round")
+    args = parser.parse_args()
+    torch.set_num_threads(1)
+
+    full = BatchedEvaluator("CartPole-v1", episodes=sum(args.rounds))
+    sequential = SequentialEvaluator("CartPole-v1", rounds=args.rounds, delta=args.delta)
+    print(f"{'episode':>8}{'full pass':>11}{'seq pass':>10}{'agree':>7}{'episodes':>10}{'full s':>8}{'seq s':>7}")
+    totals = np.zeros(4)
+    for episode, policy in snapshots(args.episodes, args.every):
+        rows = []
+        for trial in range(args.trials):
+            full.seed(trial)
+            sequential.seed(trial)
+            full_pass, _, full_time = timed(full, policy)
+            seq_pass, seq_episodes, seq_time = timed(sequential, policy)
+            rows.append((full_pass, seq_pass, seq_episodes, full_time, seq_time))
+        full_pass, seq_pass, seq_episodes, full_time, seq_time = map(np.array, zip(*rows))
+        # a snapshot's reference decision is the majority of its full evaluations
+        agree = np.mean(seq_pass == (full_pass.mean() > 0.5))
+        totals += [agree, seq_episodes.mean(), full_time.sum(), seq_time.sum()]
+        print(f"{episode:>8}{full_pass.mean():>11.2f}{seq_pass.mean():>10.2f}{agree:>7.2f}{seq_episodes.mean():>10.1f}"
+              f"{full_time.mean():>8.3f}{seq_time.mean():>7.3f}")
+    count = args.episodes // args.every
+    print(f"mean agreement {totals[0] / count:.3f}, mean episodes {totals[1] / count:.1f} of {sum(args.rounds)}, "
+          f"evaluation time {totals[3]:.1f}s vs {totals[2]:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Closed-loop load on the micro-batching policy server, per batching deadline and client count.
+
+For every --max-delay-ms value a `python -m drl serve` process is started on a free
+localhost port; for every --clients value that many client threads then send single-state
+requests back to back over keep-alive connections for --duration seconds. Reported are the
+client-side throughput and p50/p99 latency and the server's mean batch size over the run.
+Without --checkpoint a freshly initialized DQN5Layers is served.
+
+Run from the repository root:
+
+    python -m benchmarks.serving_load --max-delay-ms 0 1 5 --clients 1 8 32 --duration 3
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import torch
+
+from drl.models import DQN5Layers
+from drl.serving import PolicyClient, load_model
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(checkpoint, port, max_delay_ms, max_batch_size):
+    server = subprocess.Popen([sys.executable, "-m", "drl", "serve", checkpoint, "--port", str(port),
+                               "--max-delay-ms", str(max_delay_ms), "--max-batch-size", str(max_batch_size)],
+                              stdout=subprocess.DEVNULL)
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        probe = PolicyClient(port=port)
+        try:
+            probe.stats()
+            probe.close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.kill()
+    raise RuntimeError("the server did not come up within 60 s")
+
+
+def run_clients(port, clients, duration, seed=0):
+    """Closed-loop clients; returns (requests per second, latencies in seconds)."""
+    latencies = [[] for _ in range(clients)]
+    stop = time.perf_counter() + duration
+
+    def client(i):
+        rng = np.random.default_rng(seed + i)
+        connection = PolicyClient(port=port)
+        while time.perf_counter() < stop:
+            state = rng.standard_normal(4)
+            start = time.perf_counter()
+            connection.act(state)
+            latencies[i].append(time.perf_counter() - start)
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies = np.concatenate([np.array(client_latencies) for client_latencies in latencies])
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default=None, help="model to serve, see drl.serving.load_model")
+    parser.add_argument("--max-delay-ms", type=float, nargs="+", default=[0, 1, 5])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=3.0, help="seconds per client count")
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        checkpoint = args.checkpoint
+        if checkpoint is None:
+            torch.manual_seed(0)
+            checkpoint = os.path.join(directory, "model.pt")
+            torch.save(DQN5Layers(4, 2).state_dict(), checkpoint)
+        model, _ = load_model(checkpoint)
+
+        print(f"{os.cpu_count()} cores")
+        for max_delay_ms in args.max_delay_ms:
+            port = free_port()
+            server = start_server(checkpoint, port, max_delay_ms, args.max_batch_size)
+            try:
+                client = PolicyClient(port=port)
+                states = np.random.default_rng(0).standard_normal((256, 4)).astype(np.float32)
+                with torch.no_grad():
+                    expected = model(torch.from_numpy(states)).argmax(dim=1).numpy()
+                agreement = np.mean(np.array(client.act_batch(states)) == expected)
+                for clients in args.clients:
+                    before = client.stats()
+                    throughput, latencies = run_clients(port, clients, args.duration)
+                    after = client.stats()
+                    batches = after["batches"] - before["batches"]
+                    mean_batch = (after["states"] - before["states"]) / batches if batches else 0.0
+                    p50, p99 = 1e3 * np.percentile(latencies, [50, 99])
+                    print(f"max delay {max_delay_ms:4.1f} ms, {clients:3d} clients: {throughput:7.0f} requests/s, "
+                          f"p50 {p50:6.2f} ms, p99 {p99:6.2f} ms, mean batch {mean_batch:5.1f}, "
+                          f"agreement with torch {agreement:.3f}")
+                client.close()
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Shared building blocks for the DRL homework experiments."""
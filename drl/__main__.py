@@ -0,0 +1,4 @@
+from drl.cli import main
+
+if __name__ == "__main__":
+    main()
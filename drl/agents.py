@@ -0,0 +1,230 @@
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.optim as optim
+
+from drl.inference import NumpyPolicy
+from drl.profiling import NULL_TIMER
+from drl.replay import ArrayReplayBuffer, MemmapReplayBuffer, NStepAccumulator, SumTreeReplayBuffer
+
+
+class CAgent:
+    # n_step > 1 stores n-step transitions (drl.replay.NStepAccumulator, one per env);
+    # double_dqn picks the bootstrap action with the online model and scores it with the target model;
+    # with replay_dir the replay columns are memory-mapped files there, kept within replay_budget
+    def __init__(self, env, model, learning_rate, initial_epsilon, epsilon_decay, final_epsilon, discount_factor,
+                 store_next_state=True, n_step=1, double_dqn=False, buffer_size=10000, replay_dir=None,
+                 replay_budget=None):
+        self.env = env
+        self.model = model
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model.to(self.device)
+        self.policy = NumpyPolicy(self.model)
+
+        self.target_model = type(model)(env.observation_space.shape[0], env.action_space.n).to(self.device)
+        self.target_model.load_state_dict(self.model.state_dict())
+        self.target_model.eval()
+
+        self.optimizer = optim.Adam(self.model.parameters(), lr=learning_rate)
+        self.criterion = nn.MSELoss()
+        if replay_dir is None:
+            self.replay_memory = ArrayReplayBuffer(buffer_size, env.observation_space.shape,
+                                                   store_next_state=store_next_state)
+        elif store_next_state:
+            self.replay_memory = MemmapReplayBuffer(buffer_size, env.observation_space.shape, replay_dir,
+                                                    budget=replay_budget)
+        else:
+            raise ValueError("memory-mapped replay always stores next states")
+
+        self.epsilon = initial_epsilon
+        self.epsilon_decay = epsilon_decay
+        self.final_epsilon = final_epsilon
+        self.discount_factor = discount_factor
+        self.n_step = n_step
+        self.double_dqn = double_dqn
+        self.accumulators = {}
+        self.timer = NULL_TIMER
+
+    def sample_action(self, state):
+        if np.random.random() < self.epsilon:
+            return self.env.action_space.sample()
+        return self.policy.act(state)
+
+    def sample_actions(self, states):
+        """Epsilon-greedy actions for a batch of states, using a single forward pass."""
+        actions = self.policy.act_batch(states)
+        explore = np.random.random(len(actions)) < self.epsilon
+        actions[explore] = np.random.randint(self.env.action_space.n, size=explore.sum())
+        return actions
+
+    def test_action(self, state):
+        return self.policy.act(state)
+
+    def test_actions(self, states):
+        """Greedy actions for a batch of states, using a single forward pass."""
+        return self.policy.act_batch(states)
+
+    def decay_epsilon(self):
+        self.epsilon = max(self.final_epsilon, self.epsilon * (1 - self.epsilon_decay))
+
+    def _accumulator(self, env_index):
+        accumulator = self.accumulators.get(env_index)
+        if accumulator is None:
+            accumulator = self.accumulators[env_index] = NStepAccumulator(self.n_step, self.discount_factor)
+        return accumulator
+
+    def store_experience(self, experience, truncated=False):
+        if self.n_step == 1:
+            self.replay_memory.append(*experience)
+            return
+        for transition in self._accumulator(0).push(*experience, truncated):
+            self.replay_memory.append(*transition)
+
+    def store_experiences(self, states, actions, rewards, next_states, dones, truncateds=None, env_indices=None):
+        """One transition per env of a vector env; n-step needs truncateds and the env index of every row."""
+        if self.n_step == 1:
+            self.replay_memory.extend(states, actions, rewards, next_states, dones)
+            return
+        for row, env_index in enumerate(env_indices):
+            for transition in self._accumulator(env_index).push(states[row], actions[row], rewards[row],
+                                                                next_states[row], dones[row], truncateds[row]):
+                self.replay_memory.append(*transition)
+
+    def pending_transitions(self, next_states):
+        """
+        The n-step windows still open in the per-env accumulators, cut short as if truncated.
+
+        Args:
+            next_states: Latest state of every env of the vector env, by env index.
+
+        Returns:
+            Columns (states, actions, rewards, next_states, dones) as lists, empty without
+            open windows.
+        """
+        rows = [transition for env_index, accumulator in self.accumulators.items()
+                for transition in accumulator.tail(next_states[env_index])]
+        return tuple(list(column) for column in zip(*rows)) if rows else ([], [], [], [], [])
+
+    def sample_batch(self, batch_size):
+        return tuple(torch.from_numpy(column) for column in self.replay_memory.sample(batch_size))
+
+    def update_target_model(self):
+        with self.timer.phase("target_sync"):
+            self.target_model.load_state_dict(self.model.state_dict())
+
+    def train_on_batch(self, batch_size):
+        if len(self.replay_memory) < batch_size:
+            return None
+        with self.timer.phase("replay_sample"):
+            batch = self.sample_batch(batch_size)
+        with self.timer.phase("to_tensor"):
+            states, actions, rewards, next_states, dones = (column.to(self.device) for column in batch)
+
+        with self.timer.phase("forward_backward"):
+            current_q_values = self.model(states).gather(1, actions.unsqueeze(-1)).squeeze(-1)
+            with torch.no_grad():
+                if self.double_dqn:
+                    next_actions = self.model(next_states).argmax(1, keepdim=True)
+                    max_next_q_values = self.target_model(next_states).gather(1, next_actions).squeeze(-1)
+                else:
+                    max_next_q_values = self.target_model(next_states).max(1)[0]
+                target_q_values = rewards + (1 - dones) * self.discount_factor * max_next_q_values
+
+            loss = self.criterion(current_q_values, target_q_values)
+            self.optimizer.zero_grad()
+            loss.backward()
+            self.optimizer.step()
+            self.policy.invalidate()
+            loss = loss.item()
+        self.timer.count("updates")
+
+        return loss
+
+
+# train an agent with importance sampling
+class CAgentIS:
+    def __init__(self, env, model, learning_rate, initial_epsilon, epsilon_decay, final_epsilon, discount_factor, buffer_size=10000,
+                 n_step=1, double_dqn=False, replay_dir=None, replay_budget=None):
+        self.env = env
+        self.model = model
+        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+        self.model.to(self.device)
+        self.policy = NumpyPolicy(self.model)
+
+        self.target_model = type(model)(env.observation_space.shape[0], env.action_space.n).to(self.device)
+        self.target_model.load_state_dict(self.model.state_dict())
+        self.target_model.eval()
+
+        self.optimizer = optim.Adam(self.model.parameters(), lr=learning_rate)
+        self.criterion = nn.MSELoss(reduction='none')  # Use reduction='none' for PER
+        self.replay_buffer = SumTreeReplayBuffer(max_size=buffer_size, directory=replay_dir, budget=replay_budget)
+
+        self.epsilon = initial_epsilon
+        self.epsilon_decay = epsilon_decay
+        self.final_epsilon = final_epsilon
+        self.discount_factor = discount_factor
+        self.n_step = n_step
+        self.double_dqn = double_dqn
+        self.accumulator = NStepAccumulator(n_step, discount_factor)
+        self.timer = NULL_TIMER
+
+    def sample_action(self, state):
+        if np.random.random() < self.epsilon:
+            return self.env.action_space.sample()
+        return self.policy.act(state)
+
+    def test_action(self, state):
+        return self.policy.act(state)
+
+    def test_actions(self, states):
+        """Greedy actions for a batch of states, using a single forward pass."""
+        return self.policy.act_batch(states)
+
+    def decay_epsilon(self):
+        self.epsilon = max(self.final_epsilon, self.epsilon * (1 - self.epsilon_decay))
+
+    def store_experience(self, experience, error, truncated=False):
+        if self.n_step == 1:
+            self.replay_buffer.add(experience, error)
+            return
+        # the initial priority abs(reward) of train_agentIS, taken over the n-step reward
+        for transition in self.accumulator.push(*experience, truncated):
+            self.replay_buffer.add(transition, abs(transition[2]))
+
+    def train_on_batch(self, batch_size):
+        if len(self.replay_buffer) < batch_size:
+            return None
+        with self.timer.phase("replay_sample"):
+            batch, indices, weights = self.replay_buffer.sample(batch_size)
+        with self.timer.phase("to_tensor"):
+            states, actions, rewards, next_states, dones = (torch.from_numpy(column).to(self.device) for column in batch)
+            weights = torch.as_tensor(weights, dtype=torch.float32, device=self.device)
+
+        with self.timer.phase("forward_backward"):
+            current_q_values = self.model(states).gather(1, actions.unsqueeze(-1)).squeeze(-1)
+            with torch.no_grad():
+                if self.double_dqn:
+                    next_actions = self.model(next_states).argmax(1, keepdim=True)
+                    max_next_q_values = self.target_model(next_states).gather(1, next_actions).squeeze(-1)
+                else:
+                    max_next_q_values = self.target_model(next_states).max(1)[0]
+                target_q_values = rewards + (1 - dones) * self.discount_factor * max_next_q_values
+
+            errors = torch.abs(current_q_values - target_q_values)
+            loss = (weights * self.criterion(current_q_values, target_q_values)).mean()
+
+            self.optimizer.zero_grad()
+            loss.backward()
+            self.optimizer.step()
+            self.policy.invalidate()
+
+        with self.timer.phase("priority_update"):
+            self.replay_buffer.update_priority(indices, errors.cpu().detach().numpy())
+        self.timer.count("updates")
+
+        return loss.item()
+
+
+    def update_target_model(self):
+        with self.timer.phase("target_sync"):
+            self.target_model.load_state_dict(self.model.state_dict())
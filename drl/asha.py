@@ -0,0 +1,113 @@
+import json
+import math
+import os
+
+from drl.sweep import WorkerResults, _init_worker, _run_config, config_seed, pool_context
+
+
+def _config_key(config):
+    return json.dumps(config, sort_keys=True, default=str)
+
+
+class _RunToRung:
+    """Picklable run(config, seed) that trains a config up to a rung's episode count."""
+
+    def __init__(self, run, episodes):
+        self.run = run
+        self.episodes = episodes
+
+    def __call__(self, config, seed):
+        return dict(self.run(config, seed, episodes=self.episodes), episodes=self.episodes)
+
+
+class SuccessiveHalving:
+    def __init__(self, rungs=(200, 400, 800, 1200), keep=0.5, metric="test_reward"):
+        """
+        Asynchronous successive halving (ASHA) over a grid of configs.
+
+        Every config is first trained to rungs[0] episodes. Whenever a worker frees up,
+        the scheduler promotes a config that sits in the top keep fraction of the results
+        reported at its rung so far, and otherwise starts a new config. Promoted configs
+        continue from their checkpoint, so run must checkpoint at every rung (with
+        drl.checkpoint.Checkpointer, which also saves after the last episode of a call).
+
+        Args:
+            rungs: Increasing episode counts at which configs are compared; the last one
+                is the full training length.
+            keep: Fraction of the configs reported at a rung that may be promoted.
+            metric: Result key to maximize, e.g. the test_agent score at the rung.
+        """
+        self.rungs = list(rungs)
+        self.keep = keep
+        self.metric = metric
+
+    def _next_job(self, pending):
+        # promote from the highest rung first so that good configs finish early
+        for rung in reversed(range(len(self.rungs) - 1)):
+            scores = self.scores[rung]
+            ranked = sorted(scores, key=scores.get, reverse=True)[:math.floor(len(scores) * self.keep)]
+            for key in ranked:
+                if key not in self.promoted[rung]:
+                    self.promoted[rung].add(key)
+                    return self.configs[key], rung + 1
+        if pending:
+            return pending.pop(0), 0
+        return None
+
+    def run(self, run, configs, workers=None, threads_per_worker=1, base_seed=0):
+        """
+        Run the schedule in a pool of worker processes, as drl.sweep.run_sweep does.
+
+        Args:
+            run: Picklable function called as run(config, seed, episodes=rung) in a
+                worker, returning a dict that contains self.metric.
+            configs: List of config dicts.
+            workers, threads_per_worker, base_seed: As in run_sweep.
+
+        Yields:
+            (config, result) tuples in completion order, one per finished rung, where
+            result["episodes"] is the rung the config was trained to.
+        """
+        self.configs = {_config_key(config): config for config in configs}
+        self.scores = [{} for _ in self.rungs]
+        self.promoted = [set() for _ in self.rungs]
+        self.episodes_trained = 0
+        self.worker_seconds = 0.0
+        self.full_grid_episodes = len(configs) * self.rungs[-1]
+        pending = list(configs)
+
+        workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+        ctx = pool_context()
+        results = WorkerResults(ctx)
+        with ctx.Pool(min(workers, len(configs)), initializer=_init_worker,
+                      initargs=(results, threads_per_worker)) as pool:
+            def submit(config, rung):
+                pool.apply_async(_run_config, (_RunToRung(run, self.rungs[rung]), config,
+                                               config_seed(config, base_seed)),
+                                 error_callback=lambda e: results.put(None, config, None, repr(e)))
+
+            in_flight = 0
+            while in_flight < workers and (job := self._next_job(pending)) is not None:
+                submit(*job)
+                in_flight += 1
+            while in_flight:
+                config, result, error = results.next_result()
+                in_flight -= 1
+                if error is not None:
+                    raise RuntimeError(f"config {config} failed:\n{error}")
+                rung = self.rungs.index(result["episodes"])
+                self.scores[rung][_config_key(config)] = result[self.metric]
+                self.episodes_trained += self.rungs[rung] - (self.rungs[rung - 1] if rung else 0)
+                self.worker_seconds += result.get("wall_time", 0.0)
+                yield config, result
+                while in_flight < workers and (job := self._next_job(pending)) is not None:
+                    submit(*job)
+                    in_flight += 1
+
+    def summary(self):
+        """Configs per rung and the training episodes saved versus running the full grid."""
+        lines = [f"rung {episodes:>5} episodes: {len(scores)} configs" for episodes, scores in zip(self.rungs, self.scores)]
+        saved = 1 - self.episodes_trained / self.full_grid_episodes
+        lines.append(f"trained {self.episodes_trained} of {self.full_grid_episodes} full-grid episodes "
+                     f"({100 * saved:.1f}% saved), {self.worker_seconds:.0f} worker seconds")
+        return "\n".join(lines)
@@ -0,0 +1,138 @@
+import json
+import os
+import random
+import shutil
+
+import numpy as np
+
+_REPLAY_ATTRIBUTES = ("replay_memory", "replay_buffer")
+
+
+def _replay_attribute(agent):
+    for name in _REPLAY_ATTRIBUTES:
+        if hasattr(agent, name):
+            return name
+    raise AttributeError(f"{type(agent).__name__} has none of the replay attributes {_REPLAY_ATTRIBUTES}")
+
+
+class Checkpointer:
+    def __init__(self, directory, every=50):
+        """
+        Periodic checkpoints of an agent and its training loop, resumable in well under a second.
+
+        A checkpoint is a directory holding agent.pt (online and target networks, Adam
+        state, epsilon and the torch/NumPy/random RNG states), the replay buffer written
+        as raw .npy arrays by its save method, and the loop state: list entries as .npy
+        arrays, scalars in loop.json. Resuming memory-maps the replay arrays instead of
+        unpickling them, or copies them into the files of a memory-mapped buffer. Checkpoints are written to a temporary directory and published
+        by atomically replacing the "latest" file, so a crash mid-save leaves the
+        previous checkpoint intact.
+
+        Works with any agent exposing model, target_model, optimizer, epsilon and a
+        replay_memory or replay_buffer with save/load, i.e. CAgent and CAgentIS.
+
+        Args:
+            directory: Directory holding the checkpoints of one run.
+            every: Episode interval used by maybe_save.
+        """
+        self.directory = directory
+        self.every = every
+
+    def latest(self):
+        """Path of the newest complete checkpoint, or None."""
+        try:
+            with open(os.path.join(self.directory, "latest")) as f:
+                return os.path.join(self.directory, f.read().strip())
+        except FileNotFoundError:
+            return None
+
+    def maybe_save(self, agent, episode, final=False, **loop_state):
+        """Save after every self.every-th episode, and after the final one of a training call."""
+        if final or (episode + 1) % self.every == 0:
+            self.save(agent, episode, **loop_state)
+
+    def save(self, agent, episode, **loop_state):
+        """
+        Save the agent and the loop state after episode.
+
+        Args:
+            agent: Agent to save.
+            episode: Index of the last finished episode.
+            **loop_state: Loop variables; lists are stored as arrays, everything else
+                must be JSON serializable.
+        """
+        import torch
+
+        name = f"episode-{episode:06d}"
+        tmp = os.path.join(self.directory, name + ".tmp")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+
+        torch.save({
+            "model": agent.model.state_dict(),
+            "target_model": agent.target_model.state_dict(),
+            "optimizer": agent.optimizer.state_dict(),
+            "epsilon": agent.epsilon,
+            "torch_rng": torch.get_rng_state(),
+            "numpy_rng": np.random.get_state(),
+            "python_rng": random.getstate(),
+        }, os.path.join(tmp, "agent.pt"))
+        getattr(agent, _replay_attribute(agent)).save(os.path.join(tmp, "replay"))
+
+        scalars = {"episode": episode}
+        for key, value in loop_state.items():
+            if isinstance(value, list):
+                np.save(os.path.join(tmp, f"{key}.npy"), np.asarray(value))
+            else:
+                scalars[key] = value
+        with open(os.path.join(tmp, "loop.json"), "w") as f:
+            json.dump(scalars, f, default=float)
+
+        previous = self.latest()
+        shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+        os.rename(tmp, os.path.join(self.directory, name))
+        with open(os.path.join(self.directory, "latest.tmp"), "w") as f:
+            f.write(name)
+        os.replace(os.path.join(self.directory, "latest.tmp"), os.path.join(self.directory, "latest"))
+        if previous is not None and os.path.basename(previous) != name:
+            shutil.rmtree(previous, ignore_errors=True)
+
+    def restore(self, agent):
+        """
+        Load the newest checkpoint into agent.
+
+        Returns:
+            The loop state passed to save, with "episode" and the list entries restored
+            as lists, or None if there is no checkpoint yet.
+        """
+        import torch
+
+        path = self.latest()
+        if path is None:
+            return None
+
+        state = torch.load(os.path.join(path, "agent.pt"), map_location=agent.device, weights_only=False)
+        agent.model.load_state_dict(state["model"])
+        agent.target_model.load_state_dict(state["target_model"])
+        agent.optimizer.load_state_dict(state["optimizer"])
+        agent.epsilon = state["epsilon"]
+        torch.set_rng_state(state["torch_rng"])
+        np.random.set_state(state["numpy_rng"])
+        random.setstate(state["python_rng"])
+        if hasattr(agent, "policy"):
+            agent.policy.invalidate()
+
+        name = _replay_attribute(agent)
+        buffer = getattr(agent, name)
+        if getattr(buffer, "directory", None) is not None:
+            # a memory-mapped buffer copies the checkpoint into its own files instead of mapping it
+            buffer.restore(os.path.join(path, "replay"))
+        else:
+            setattr(agent, name, type(buffer).load(os.path.join(path, "replay")))
+
+        with open(os.path.join(path, "loop.json")) as f:
+            loop_state = json.load(f)
+        for file in os.listdir(path):
+            if file.endswith(".npy"):
+                loop_state[file[:-4]] = np.load(os.path.join(path, file)).tolist()
+        return loop_state
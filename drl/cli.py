@@ -0,0 +1,131 @@
+"""Run the homework experiments.
+
+    python -m drl qlearning-sweep            # section 1, tabular Q-learning grid on FrozenLake
+    python -m drl qlearning-sweep --map-sizes 8 32 128 256   # the grid on generated maps of each size
+    python -m drl dqn-sweep --workers 4      # section 2, DQN grid on CartPole
+    python -m drl per                        # section 3, DQN with prioritized replay
+    python -m drl distributed --actors 4     # section 3 DQN with parallel actor processes
+    python -m drl serve CHECKPOINT           # serve a trained DQN's greedy actions over localhost HTTP
+    python -m drl export CHECKPOINT --quantize   # frozen TorchScript (and int8) policies with a drift report
+    python -m drl results --best-per-model   # best stored dqn-sweep run of each model
+
+Only argparse is imported up front; each experiment imports torch, gymnasium and the
+rest of its dependencies when it starts.
+"""
+import argparse
+
+
+def _training_parser():
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--log-dir", default="runs", help="directory for the local metrics")
+    parser.add_argument("--wandb", action="store_true", help="also log to Weights & Biases")
+    parser.add_argument("--profile", action="store_true", help="time the phases of every training step")
+    parser.add_argument("--trace-dir", default=None, help="write a torch.profiler trace here")
+    parser.add_argument("--train-every", type=int, default=1, help="env steps between updates")
+    parser.add_argument("--gradient-steps", type=int, default=1, help="gradient steps per update")
+    parser.add_argument("--warmup", type=int, default=0, help="env steps before the first update")
+    parser.add_argument("--target-update-steps", type=int, default=None,
+                        help="sync the target network every this many gradient steps instead of every 2 episodes")
+    parser.add_argument("--n-step", type=int, default=1, help="bootstrap from n-step returns")
+    parser.add_argument("--double-dqn", action="store_true", help="use Double DQN targets")
+    parser.add_argument("--sequential-eval", action="store_true",
+                        help="stop each periodic evaluation once a confidence bound decides mean > 475")
+    parser.add_argument("--eval-delta", type=float, default=0.05, help="error rate of --sequential-eval")
+    parser.add_argument("--replay-size", type=int, default=10000, help="replay capacity in transitions")
+    parser.add_argument("--replay-dir", default=None,
+                        help="keep the replay columns in memory-mapped files under this local directory")
+    parser.add_argument("--replay-rss-mb", type=int, default=256,
+                        help="resident memory of the memory-mapped replay files per process, in MiB")
+    parser.add_argument("--checkpoint-dir", default=None,
+                        help="checkpoint here and resume from it; with --num-envs, episodes in progress at the "
+                             "checkpoint start over (their open n-step transitions are kept)")
+    parser.add_argument("--checkpoint-every", type=int, default=50, help="episodes between checkpoints")
+    return parser
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m drl", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    experiments = parser.add_subparsers(dest="experiment", required=True)
+    training = _training_parser()
+
+    qlearning = experiments.add_parser("qlearning-sweep", help="section 1 tabular Q-learning grid")
+    qlearning.add_argument("--episodes", type=int, default=5000, help="episodes per config")
+    qlearning.add_argument("--seed", type=int, default=None)
+    qlearning.add_argument("--map-sizes", type=int, nargs="+", default=None,
+                           help="train on a generated NxN map of each size and report memory and steps/sec")
+    qlearning.add_argument("--map-seed", type=int, default=0, help="seed of generate_random_map")
+    qlearning.add_argument("--frozen-prob", type=float, default=0.8, help="probability of a frozen tile")
+    qlearning.add_argument("--results-db", default="results.db",
+                           help="SQLite store of finished configs; with --seed only the missing ones train")
+    qlearning.add_argument("--rerun", action="store_true", help="train every config, replacing stored results")
+    qlearning.set_defaults(run="qlearning_sweep")
+
+    dqn = experiments.add_parser("dqn-sweep", parents=[training], help="section 2 DQN hyperparameter sweep")
+    dqn.add_argument("--workers", type=int, default=None, help="worker processes, defaults to one per core")
+    dqn.add_argument("--threads-per-worker", type=int, default=1, help="torch intra-op threads per worker")
+    dqn.add_argument("--num-envs", type=int, default=1, help="> 1 trains each config on a vector env")
+    dqn.add_argument("--ensemble", action="store_true",
+                     help="train configs sharing a model and batch size as one vmapped ensemble per worker")
+    dqn.add_argument("--asha", action="store_true",
+                     help="successive halving: only promote the best configs from one rung to the next")
+    dqn.add_argument("--rungs", type=int, nargs="+", default=[200, 400, 800, 1200], help="episodes per rung")
+    dqn.add_argument("--keep", type=float, default=0.5, help="fraction of configs promoted at each rung")
+    dqn.add_argument("--results-db", default="results.db",
+                     help="SQLite store of finished configs; only the missing ones train (not with --ensemble/--asha)")
+    dqn.add_argument("--rerun", action="store_true", help="train every config, replacing stored results")
+    dqn.set_defaults(run="dqn_sweep")
+
+    per = experiments.add_parser("per", parents=[training], help="section 3 prioritized replay run")
+    per.add_argument("--uniform", action="store_true", help="train CAgent with uniform replay instead")
+    per.set_defaults(run="per_run")
+
+    distributed = experiments.add_parser("distributed", parents=[training],
+                                         help="DQN with actor processes feeding a learner through shared memory")
+    distributed.add_argument("--actors", type=int, default=2, help="actor processes")
+    distributed.add_argument("--episodes", type=int, default=1200, help="episodes over all actors")
+    distributed.add_argument("--seed", type=int, default=0, help="actor i uses seed + i")
+    distributed.add_argument("--push-every", type=int, default=50, help="gradient steps between weight publications")
+    distributed.add_argument("--pull-every", type=int, default=100, help="env steps between an actor's weight polls")
+    distributed.add_argument("--max-lead", type=int, default=1000,
+                             help="env steps the actors may run ahead of the replay ratio, negative for unlimited")
+    distributed.set_defaults(run="distributed_run")
+
+    serve = experiments.add_parser("serve", help="micro-batching HTTP endpoint for a trained DQN")
+    serve.add_argument("checkpoint", help="saved state dict, Checkpointer agent.pt or checkpoint directory")
+    serve.add_argument("--model", default=None, help="DQN3Layers or DQN5Layers, inferred by default")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--max-batch-size", type=int, default=256, help="states per forward pass")
+    serve.add_argument("--max-delay-ms", type=float, default=2.0,
+                       help="how long the first request of a batch waits for others")
+    serve.set_defaults(run="serve")
+
+    export = experiments.add_parser("export", help="frozen TorchScript policy export with a drift and latency report")
+    export.add_argument("checkpoint", help="saved state dict, Checkpointer agent.pt or checkpoint directory")
+    export.add_argument("--model", default=None, help="DQN3Layers or DQN5Layers, inferred by default")
+    export.add_argument("--out", default="export", help="directory for policy.pt and policy_int8.pt")
+    export.add_argument("--quantize", action="store_true", help="also export a dynamically int8-quantized policy")
+    export.add_argument("--states", type=int, default=10000, help="greedy rollout states to compare actions on")
+    export.add_argument("--episodes", type=int, default=100, help="test episodes per variant")
+    export.add_argument("--seed", type=int, default=0)
+    export.set_defaults(run="export")
+
+    results = experiments.add_parser("results", help="query the sweep results store")
+    results.add_argument("--results-db", default="results.db")
+    results.add_argument("--sweep", default="dqn", choices=["dqn", "qlearning"])
+    results.add_argument("--metric", default=None,
+                         help="stored metric to rank by, default avg_reward (dqn) or avg_steps (qlearning)")
+    results.add_argument("--ascending", action="store_true", help="rank the lowest values first")
+    results.add_argument("--top", type=int, default=10, help="number of runs to list")
+    results.add_argument("--best-per-model", action="store_true", help="list the best run of each model instead")
+    results.add_argument("--current", action="store_true", help="only runs of the current code version")
+    results.set_defaults(run="results")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    from drl import experiments
+
+    getattr(experiments, args.run)(args)
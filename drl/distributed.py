@@ -0,0 +1,359 @@
+import queue
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from drl.metrics import NullMetrics
+from drl.profiling import NULL_TIMER
+from drl.replay import ArrayReplayBuffer
+from drl.schedule import UpdateSchedule
+from drl.sweep import pool_context
+
+
+class SharedReplayBuffer(ArrayReplayBuffer):
+    def __init__(self, capacity, state_shape, state_dtype=np.float32, ctx=None):
+        """
+        ArrayReplayBuffer whose columns live in one shared-memory block.
+
+        The buffer can be passed to processes started from ctx: actors extend it with
+        chunks of transitions and the learner samples from it, all without copying
+        through pipes. Writes copy their slots, and gathers read them, under one lock, so
+        the transitions of two actors never interleave within a slot and a sampled row
+        is never half old and half new once the ring has wrapped. A gather of a batch
+        holds the lock for a few microseconds of fancy indexing.
+
+        Args:
+            capacity: Maximum number of transitions.
+            state_shape: Shape of a single state.
+            state_dtype: Dtype of the state columns.
+            ctx: Multiprocessing context the actors are started from.
+        """
+        ctx = ctx if ctx is not None else pool_context()
+        self.capacity = capacity
+        self.store_next_state = True
+        self.state_shape = tuple(state_shape)
+        self.state_dtype = np.dtype(state_dtype)
+        self._written = ctx.Value("q", 0)
+        self._block = shared_memory.SharedMemory(create=True, size=sum(
+            np.dtype(dtype).itemsize * int(np.prod(shape)) for _, shape, dtype in self._layout()))
+        self._owner = True
+        self._map()
+
+    def _layout(self):
+        return [("states", (self.capacity, *self.state_shape), self.state_dtype),
+                ("next_states", (self.capacity, *self.state_shape), self.state_dtype),
+                ("actions", (self.capacity,), np.int64),
+                ("rewards", (self.capacity,), np.float32),
+                ("dones", (self.capacity,), np.float32)]
+
+    def _map(self):
+        offset = 0
+        for name, shape, dtype in self._layout():
+            column = np.ndarray(shape, dtype=dtype, buffer=self._block.buf, offset=offset)
+            setattr(self, name, column)
+            offset += column.nbytes
+
+    def __getstate__(self):
+        return {"capacity": self.capacity, "state_shape": self.state_shape, "state_dtype": self.state_dtype.str,
+                "name": self._block.name, "written": self._written}
+
+    def __setstate__(self, state):
+        self.capacity = state["capacity"]
+        self.store_next_state = True
+        self.state_shape = state["state_shape"]
+        self.state_dtype = np.dtype(state["state_dtype"])
+        self._written = state["written"]
+        self._block = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+        self._map()
+
+    @property
+    def written(self):
+        """Transitions added so far by all processes."""
+        return self._written.value
+
+    @property
+    def size(self):
+        return min(self._written.value, self.capacity)
+
+    @property
+    def position(self):
+        return self._written.value % self.capacity
+
+    def append(self, state, action, reward, next_state, done):
+        self.extend([state], [action], [reward], [next_state], [done])
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        with self._written.get_lock():
+            slots = (self._written.value + np.arange(len(actions))) % self.capacity
+            self.states[slots] = states
+            self.actions[slots] = actions
+            self.rewards[slots] = rewards
+            self.next_states[slots] = next_states
+            self.dones[slots] = dones
+            self._written.value += len(actions)
+
+    def gather(self, indices):
+        with self._written.get_lock():
+            return super().gather(indices)
+
+    def snapshot(self):
+        """Private ArrayReplayBuffer copy of the transitions, with the same slots and write position."""
+        copy = ArrayReplayBuffer(self.capacity, self.state_shape, self.state_dtype)
+        with self._written.get_lock():
+            for name in ("states", "next_states", "actions", "rewards", "dones"):
+                getattr(copy, name)[...] = getattr(self, name)
+            copy.position, copy.size = self.position, self.size
+        return copy
+
+    def save(self, directory):
+        """Save a snapshot as ArrayReplayBuffer.save does; load returns an ArrayReplayBuffer."""
+        self.snapshot().save(directory)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="c"):
+        """Reopen a saved snapshot as a private ArrayReplayBuffer; shared blocks are not restored."""
+        return ArrayReplayBuffer.load(directory, mmap_mode)
+
+    def close(self):
+        """Release this process's mapping, and free the block in the process that created it."""
+        for name, _, _ in self._layout():
+            delattr(self, name)
+        self._block.close()
+        if self._owner:
+            self._block.unlink()
+
+
+class SharedWeights:
+    def __init__(self, size, ctx=None):
+        """
+        Flat policy parameters published by the learner and polled by the actors.
+
+        Every push bumps a version counter. Pushes write and pulls copy the weights while
+        holding the counter's lock, so an actor never loads a half-written copy, and it
+        skips the copy when the version has not changed since its last poll.
+
+        Args:
+            size: Number of float32 parameters, NumpyPolicy.size.
+            ctx: Multiprocessing context the actors are started from.
+        """
+        ctx = ctx if ctx is not None else pool_context()
+        self.size = size
+        self._version = ctx.Value("q", 0)
+        self._block = shared_memory.SharedMemory(create=True, size=4 * size)
+        self._owner = True
+        self.array = np.ndarray(size, dtype=np.float32, buffer=self._block.buf)
+
+    def __getstate__(self):
+        return {"size": self.size, "name": self._block.name, "version": self._version}
+
+    def __setstate__(self, state):
+        self.size = state["size"]
+        self._version = state["version"]
+        self._block = shared_memory.SharedMemory(name=state["name"])
+        self._owner = False
+        self.array = np.ndarray(self.size, dtype=np.float32, buffer=self._block.buf)
+
+    def push(self, policy):
+        """Publish the weights of a NumpyPolicy mirroring the learner's model."""
+        with self._version.get_lock():
+            policy.get_flat(self.array)
+            self._version.value += 1
+
+    def pull(self, policy, version):
+        """
+        Load the published weights into policy if they are newer than version.
+
+        Args:
+            policy: NumpyPolicy to update, e.g. NumpyPolicy.from_layer_sizes.
+            version: Version the policy currently holds, -1 for none.
+
+        Returns:
+            The version the policy holds afterwards.
+        """
+        with self._version.get_lock():
+            current = self._version.value
+            if current == version:
+                return version
+            policy.set_flat(self.array)
+        return current
+
+    def close(self):
+        del self.array
+        self._block.close()
+        if self._owner:
+            self._block.unlink()
+
+
+def _actor(actor_id, env_id, replay, weights, layer_sizes, initial_epsilon, epsilon_decay, final_epsilon, seed,
+           episodes, stop, pull_every, chunk_size, updates, start_steps, env_steps_per_update, max_lead):
+    import gymnasium as gym
+
+    from drl.inference import NumpyPolicy
+
+    env = gym.make(env_id)
+    env.action_space.seed(seed)
+    rng = np.random.default_rng(seed)
+    policy = NumpyPolicy.from_layer_sizes(layer_sizes)
+    version = weights.pull(policy, -1)
+    epsilon = initial_epsilon
+    chunk = []
+    steps = 0
+    state, _ = env.reset(seed=seed)
+    while not stop.is_set():
+        total_reward = 0
+        done = False
+        truncated = False
+        while not (done or truncated):
+            if rng.random() < epsilon:
+                action = env.action_space.sample()
+            else:
+                action = policy.act(state)
+            next_state, reward, done, truncated, _ = env.step(action)
+            chunk.append((state, action, reward, next_state, done))
+            state = next_state
+            total_reward += reward
+            steps += 1
+            if len(chunk) == chunk_size or done or truncated:
+                replay.extend(*(np.array(column) for column in zip(*chunk)))
+                chunk = []
+                # wait while all actors together are more than max_lead env steps ahead of the learner
+                while (max_lead is not None and not stop.is_set() and
+                       replay.written > start_steps + updates.value * env_steps_per_update + max_lead):
+                    time.sleep(0.001)
+            if steps % pull_every == 0:
+                version = weights.pull(policy, version)
+        # same per-episode decay as CAgent.decay_epsilon, applied by each actor to its own epsilon
+        epsilon = max(final_epsilon, epsilon * (1 - epsilon_decay))
+        episodes.put((actor_id, total_reward))
+        state, _ = env.reset()
+    env.close()
+
+
+# Training Function with actor processes feeding a learner through shared memory
+def train_distributed(agent, episodes, batch_size, target_update_every, num_actors=2, env_id="CartPole-v1",
+                      metrics=None, timer=NULL_TIMER, schedule=None, evaluator=None, seed=0, push_every=50,
+                      pull_every=100, chunk_size=32, max_lead=1000):
+    """
+    Train agent with num_actors acting processes and the calling process as learner.
+
+    Each actor runs its own env with epsilon-greedy acting through a NumPy copy of the
+    policy, decays its own epsilon after each of its episodes like CAgent does, and
+    writes its transitions into a SharedReplayBuffer. The learner replaces
+    agent.replay_memory by that buffer and runs agent.train_on_batch continuously,
+    publishing its weights every push_every gradient steps.
+
+    With max_lead set, the actors keep the replay ratio of schedule: they pause while
+    they are more than max_lead env steps ahead of schedule.train_every env steps per
+    schedule.gradient_steps gradient steps, so training matches train_agent and extra
+    actors only add throughput where the learner outpaces one actor. With max_lead=None
+    the actors run freely and the learner trains on whatever they have written. Without
+    schedule.target_update_steps the target network is synced every target_update_every
+    episodes per actor, i.e. every num_actors * target_update_every finished episodes.
+    Episodes are numbered in the order the learner receives them.
+
+    Args:
+        agent: CAgent whose model is trained; its epsilon settings seed the actors.
+        episodes: Total episodes over all actors.
+        batch_size, target_update_every, metrics, timer, schedule, evaluator: As in
+            drl.training.train_agent.
+        num_actors: Actor processes.
+        env_id: Gymnasium id of the env every actor runs.
+        seed: Actor i seeds its env and exploration with seed + i.
+        push_every: Gradient steps between weight publications.
+        pull_every: Env steps between an actor's polls for new weights.
+        chunk_size: Transitions an actor buffers before writing them to the ring.
+        max_lead: Env steps the actors may run ahead of the replay ratio, or None.
+
+    Returns:
+        (rewards, losses, first_time_passed) as train_agent, where the env_steps logged
+        with each evaluation sum all actors.
+    """
+    from drl.evaluation import BatchedEvaluator
+
+    metrics = metrics if metrics is not None else NullMetrics()
+    evaluator = evaluator if evaluator is not None else BatchedEvaluator(env_id)
+    schedule = schedule if schedule is not None else UpdateSchedule()
+    agent.timer = timer
+    ctx = pool_context()
+    replay = SharedReplayBuffer(agent.replay_memory.capacity, agent.replay_memory.states.shape[1:],
+                                agent.replay_memory.states.dtype, ctx)
+    agent.replay_memory = replay
+    weights = SharedWeights(agent.policy.size, ctx)
+    weights.push(agent.policy)
+    finished = ctx.Queue()
+    stop = ctx.Event()
+    updates = ctx.Value("q", 0, lock=False)
+    start_steps = max(batch_size, schedule.warmup)
+    actors = [ctx.Process(target=_actor, daemon=True,
+                          args=(i, env_id, replay, weights, agent.policy.layer_sizes, agent.epsilon,
+                                agent.epsilon_decay, agent.final_epsilon, seed + i, finished, stop, pull_every,
+                                chunk_size, updates, start_steps, schedule.train_every / schedule.gradient_steps,
+                                max_lead))
+              for i in range(num_actors)]
+    for actor in actors:
+        actor.start()
+
+    rewards = []
+    losses = []
+    first_time_passed = 8000
+    gradient_steps = 0
+    episode_losses = []
+    try:
+        while len(rewards) < episodes:
+            while len(rewards) < episodes:
+                try:
+                    actor_id, total_reward = finished.get_nowait()
+                except queue.Empty:
+                    break
+                episode = len(rewards)
+                rewards.append(total_reward)
+                losses.extend(episode_losses)
+                if (episode + 1) % num_actors == 0 and schedule.sync_episode_due(episode // num_actors,
+                                                                                 target_update_every):
+                    agent.update_target_model()
+
+                if episode % 50 == 0:
+                    agent.model.eval()
+                    with timer.phase("evaluate"):
+                        test_rewards = evaluator(agent)
+                    metrics.log({"test_reward": np.mean(test_rewards), "eval_episodes": len(test_rewards),
+                                 "env_steps": replay.written, "gradient_steps": gradient_steps}, episode=episode)
+                    if (np.mean(test_rewards) > 475) and (first_time_passed == 8000):
+                        first_time_passed = episode
+                    agent.model.train()
+
+                metrics.log({"Reward": total_reward, "Loss": np.mean(episode_losses), "actor": actor_id},
+                            episode=episode)
+                episode_losses = []
+
+            if len(replay) < start_steps:
+                if not all(actor.is_alive() for actor in actors):
+                    raise RuntimeError("an actor process exited before training finished")
+                time.sleep(0.01)
+                continue
+            loss = agent.train_on_batch(batch_size)
+            episode_losses.append(loss)
+            gradient_steps += 1
+            updates.value = gradient_steps
+            if schedule.sync_due(gradient_steps):
+                agent.update_target_model()
+            if gradient_steps % push_every == 0:
+                with timer.phase("weight_push"):
+                    weights.push(agent.policy)
+                if not all(actor.is_alive() for actor in actors):
+                    raise RuntimeError("an actor process exited before training finished")
+    finally:
+        stop.set()
+        for actor in actors:
+            actor.join(timeout=10)
+            if actor.is_alive():
+                actor.terminate()
+        timer.count("env_steps", replay.written)
+        # the learner keeps a private copy, so the shared blocks can be freed
+        agent.replay_memory = replay.snapshot()
+        replay.close()
+        weights.close()
+
+    return rewards, losses, first_time_passed
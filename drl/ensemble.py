@@ -0,0 +1,276 @@
+import copy
+
+import numpy as np
+import torch
+from torch.func import functional_call, stack_module_state, vmap
+
+from drl.inference import NumpyPolicy
+from drl.metrics import NullMetrics
+from drl.profiling import NULL_TIMER
+from drl.replay import ArrayReplayBuffer
+from drl.schedule import UpdateSchedule
+
+
+class _Member:
+    """Greedy view of one ensemble member, for BatchedEvaluator."""
+
+    def __init__(self, ensemble, index):
+        self.ensemble = ensemble
+        self.index = index
+
+    def test_actions(self, states):
+        return self.ensemble.q_values(np.asarray(states)[None], members=[self.index])[0].argmax(axis=1)
+
+
+class EnsembleAgent:
+    def __init__(self, model_class, state_size, action_size, learning_rates, epsilon_decays, discount_factors,
+                 initial_epsilon=1.0, final_epsilon=0.01, buffer_size=10000, betas=(0.9, 0.999), eps=1e-8):
+        """
+        M CAgents of one architecture trained together as a single batched model.
+
+        The parameters of the M models are stacked along a leading member axis
+        (torch.func.stack_module_state) and the forward pass is vmapped over it, so a
+        training step runs one batched forward/backward for all members, with per-member
+        TD targets and losses. Adam is applied by hand on the stacked tensors, with a
+        per-member learning rate. Each member keeps its own epsilon, replay memory and
+        target network, and acting goes through a stacked NumPy mirror of the weights,
+        as NumpyPolicy does for a single model.
+
+        Args:
+            model_class: Linear/ReLU MLP class, e.g. DQN5Layers.
+            state_size: Size of the state vector.
+            action_size: Number of actions.
+            learning_rates, epsilon_decays, discount_factors: One value per member.
+            initial_epsilon: Starting epsilon of every member.
+            final_epsilon: Epsilon floor of every member.
+            buffer_size: Replay capacity per member.
+            betas, eps: Adam hyperparameters, torch.optim.Adam's defaults.
+        """
+        self.members = len(learning_rates)
+        self.model_class = model_class
+        self.state_size = state_size
+        models = [model_class(state_size, action_size) for _ in range(self.members)]
+        NumpyPolicy(models[0])  # raises for architectures the NumPy mirror can't run
+        self.params, self.buffers = stack_module_state(models)
+        self.target_params = {name: param.detach().clone() for name, param in self.params.items()}
+        base = copy.deepcopy(models[0]).to("meta")
+
+        def q_values(params, buffers, states):
+            return functional_call(base, (params, buffers), (states,))
+
+        self._q_values = vmap(q_values)
+        self.learning_rates = torch.tensor(learning_rates, dtype=torch.float32)
+        self.discount_factors = torch.tensor(discount_factors, dtype=torch.float32)
+        self.betas = betas
+        self.eps = eps
+        self.exp_avg = {name: torch.zeros_like(param) for name, param in self.params.items()}
+        self.exp_avg_sq = {name: torch.zeros_like(param) for name, param in self.params.items()}
+        self.steps = 0
+
+        self.epsilons = np.full(self.members, initial_epsilon, dtype=np.float64)
+        self.epsilon_decays = np.asarray(epsilon_decays, dtype=np.float64)
+        self.final_epsilon = final_epsilon
+        self.action_size = action_size
+        self.replay_memories = [ArrayReplayBuffer(buffer_size, (state_size,)) for _ in range(self.members)]
+        # members that stopped training keep their weights: their learning rate is masked to 0
+        self.active = np.ones(self.members, dtype=bool)
+        self.weights = None
+        self.timer = NULL_TIMER
+
+    def _refresh(self):
+        layers = [param.detach().numpy() for param in self.params.values()]
+        self.weights = [weight.transpose(0, 2, 1).copy() for weight in layers[0::2]]
+        self.biases = [bias[:, None, :].copy() for bias in layers[1::2]]
+
+    def q_values(self, states, members=None):
+        """
+        Q-values of every member for its own states.
+
+        Args:
+            states: [members, features] or [members, batch, features].
+            members: Indices of the members the states belong to, default all.
+
+        Returns:
+            [members, actions] or [members, batch, actions] array.
+        """
+        if self.weights is None:
+            self._refresh()
+        members = slice(None) if members is None else members
+        x = np.asarray(states, dtype=np.float32)
+        single = x.ndim == 2
+        if single:
+            x = x[:, None, :]
+        for weight, bias in zip(self.weights[:-1], self.biases[:-1]):
+            x = x @ weight[members]
+            x += bias[members]
+            np.maximum(x, 0, out=x)
+        x = x @ self.weights[-1][members] + self.biases[-1][members]
+        return x[:, 0] if single else x
+
+    def sample_actions(self, states):
+        """Epsilon-greedy action of every member for its own state, states [members, features]."""
+        actions = self.q_values(states).argmax(axis=1)
+        explore = np.random.random(self.members) < self.epsilons
+        actions[explore] = np.random.randint(self.action_size, size=explore.sum())
+        return actions
+
+    def member(self, index):
+        """Object with test_actions(states) acting greedily as member index."""
+        return _Member(self, index)
+
+    def member_model(self, index):
+        """A model_class instance holding member index's weights."""
+        model = self.model_class(self.state_size, self.action_size)
+        model.load_state_dict({name: param[index].detach().clone() for name, param in self.params.items()})
+        return model
+
+    def decay_epsilon(self, index):
+        self.epsilons[index] = max(self.final_epsilon, self.epsilons[index] * (1 - self.epsilon_decays[index]))
+
+    def store_experiences(self, members, states, actions, rewards, next_states, dones):
+        """Append one transition per listed member; the other arguments have one row per member in members."""
+        for row, i in enumerate(members):
+            self.replay_memories[i].append(states[row], actions[row], rewards[row], next_states[row], dones[row])
+
+    def sample_batch(self, batch_size):
+        columns = zip(*(memory.sample(batch_size) for memory in self.replay_memories))
+        return tuple(torch.from_numpy(np.stack(column)) for column in columns)
+
+    def update_target_models(self, members=None):
+        members = slice(None) if members is None else members
+        with self.timer.phase("target_sync"):
+            for name, param in self.params.items():
+                self.target_params[name][members] = param.detach()[members]
+
+    def _adam_step(self, grads):
+        beta1, beta2 = self.betas
+        self.steps += 1
+        bias_correction1 = 1 - beta1 ** self.steps
+        bias_correction2_sqrt = (1 - beta2 ** self.steps) ** 0.5
+        learning_rates = self.learning_rates * torch.from_numpy(self.active)
+        with torch.no_grad():
+            for (name, param), grad in zip(self.params.items(), grads):
+                exp_avg, exp_avg_sq = self.exp_avg[name], self.exp_avg_sq[name]
+                exp_avg.lerp_(grad, 1 - beta1)
+                exp_avg_sq.mul_(beta2).addcmul_(grad, grad, value=1 - beta2)
+                denominator = (exp_avg_sq.sqrt() / bias_correction2_sqrt).add_(self.eps)
+                step_size = (learning_rates / bias_correction1).view(-1, *[1] * (param.dim() - 1))
+                param.sub_(step_size * exp_avg / denominator)
+
+    def train_on_batch(self, batch_size):
+        """
+        One gradient step for every member, each on a batch from its own replay memory.
+
+        Returns:
+            Array with the loss of every member, or None while a memory is smaller than
+            a batch.
+        """
+        if min(len(memory) for memory in self.replay_memories) < batch_size:
+            return None
+        with self.timer.phase("replay_sample"):
+            states, actions, rewards, next_states, dones = self.sample_batch(batch_size)
+
+        with self.timer.phase("forward_backward"):
+            current_q_values = self._q_values(self.params, self.buffers, states)
+            current_q_values = current_q_values.gather(2, actions.unsqueeze(-1)).squeeze(-1)
+            with torch.no_grad():
+                max_next_q_values = self._q_values(self.target_params, self.buffers, next_states).max(2)[0]
+                target_q_values = rewards + (1 - dones) * self.discount_factors[:, None] * max_next_q_values
+            # members are independent, so the gradient of the summed losses is each member's own gradient
+            losses = ((current_q_values - target_q_values) ** 2).mean(1)
+            grads = torch.autograd.grad(losses.sum(), list(self.params.values()))
+            self._adam_step(grads)
+            self.weights = None
+        self.timer.count("updates")
+        return losses.detach().numpy()
+
+
+# Training Function for an ensemble, one env of the vector env per member, e.g. make_vector_env(agent.members)
+def train_ensemble(envs, agent, episodes, batch_size, target_update_every, metrics=None, timer=NULL_TIMER,
+                   schedule=None, evaluator=None):
+    """
+    Train every member of an EnsembleAgent for episodes episodes of its own env.
+
+    Every tick steps all envs once and takes the gradient steps the schedule asks for,
+    so each member sees the replay ratio, epsilon decay, target syncs and evaluations
+    of train_agent. Members that reach episodes stop training while the rest finish.
+
+    Args:
+        envs: Vector env with agent.members envs.
+        agent: EnsembleAgent.
+        episodes, batch_size, target_update_every, timer, schedule: As in
+            drl.training.train_agent.
+        metrics: One logger per member, or None.
+        evaluator: BatchedEvaluator shared by the members.
+
+    Returns:
+        List with the (rewards, losses, first_time_passed) of train_agent for each member.
+    """
+    from drl.evaluation import BatchedEvaluator
+
+    members = agent.members
+    metrics = metrics if metrics is not None else [NullMetrics()] * members
+    evaluator = evaluator if evaluator is not None else BatchedEvaluator(envs.spec.id)
+    schedule = schedule if schedule is not None else UpdateSchedule()
+    agent.timer = timer
+    rewards = [[] for _ in range(members)]
+    losses = [[] for _ in range(members)]
+    first_time_passed = [8000] * members
+    episode_losses = [[] for _ in range(members)]
+    completed = np.zeros(members, dtype=np.int64)
+    total_rewards = np.zeros(members)
+    ticks = 0
+    gradient_steps = 0
+
+    states, _ = envs.reset()
+    # with next-step autoreset, the step after an episode ends only resets that env
+    autoreset = np.zeros(members, dtype=bool)
+    while agent.active.any():
+        with timer.phase("act"):
+            actions = agent.sample_actions(states)
+        with timer.phase("env_step"):
+            next_states, step_rewards, dones, truncateds, _ = envs.step(actions)
+        live = np.flatnonzero(~autoreset & agent.active)
+        timer.count("env_steps", len(live))
+        with timer.phase("store"):
+            agent.store_experiences(live, states[live], actions[live], step_rewards[live], next_states[live],
+                                    dones[live])
+        total_rewards[live] += step_rewards[live]
+        states = next_states
+        ticks += 1
+
+        for _ in range(schedule.updates_due(ticks, min(map(len, agent.replay_memories)), batch_size)):
+            loss = agent.train_on_batch(batch_size)
+            if loss is not None:
+                for i in np.flatnonzero(agent.active):
+                    episode_losses[i].append(loss[i])
+            gradient_steps += 1
+            if schedule.sync_due(gradient_steps):
+                agent.update_target_models()
+
+        autoreset = dones | truncateds
+        for i in np.flatnonzero(autoreset & agent.active):
+            episode = int(completed[i])
+            agent.decay_epsilon(i)
+            rewards[i].append(total_rewards[i])
+            losses[i].extend(episode_losses[i])
+
+            if schedule.sync_episode_due(episode, target_update_every):
+                agent.update_target_models([i])
+
+            if episode % 50 == 0:
+                with timer.phase("evaluate"):
+                    test_rewards = evaluator(agent.member(i))
+                metrics[i].log({"test_reward": np.mean(test_rewards), "eval_episodes": len(test_rewards),
+                                "env_steps": ticks, "gradient_steps": gradient_steps}, episode=episode)
+                if (np.mean(test_rewards) > 475) and (first_time_passed[i] == 8000):
+                    first_time_passed[i] = episode
+
+            metrics[i].log({"Reward": total_rewards[i], "Loss": np.mean(episode_losses[i])}, episode=episode)
+            total_rewards[i] = 0
+            episode_losses[i] = []
+            completed[i] += 1
+            if completed[i] == episodes:
+                agent.active[i] = False
+
+    return list(zip(rewards, losses, first_time_passed))
@@ -0,0 +1,158 @@
+import gymnasium as gym
+import numpy as np
+
+
+def _make_envs(env_id, num_envs):
+    mode = "vector_entry_point" if gym.spec(env_id).vector_entry_point is not None else "sync"
+    return gym.make_vec(env_id, num_envs=num_envs, vectorization_mode=mode)
+
+
+class BatchedEvaluator:
+    def __init__(self, env_id="CartPole-v1", episodes=100, max_steps=500):
+        """
+        Runs all evaluation episodes of test_agent side by side in one vector env.
+
+        Every tick makes a single greedy forward pass over the states of all episodes
+        (agent.test_actions). Episodes that have ended are masked out until the
+        last one finishes or max_steps is reached. CartPole uses gymnasium's NumPy
+        vector implementation; other envs fall back to a synchronous vector env.
+
+        Args:
+            env_id: Gymnasium id of the environment to evaluate on.
+            episodes: Number of episodes, all run in parallel.
+            max_steps: Step cap per episode, as in test_agent.
+        """
+        self.episodes = episodes
+        self.max_steps = max_steps
+        self.envs = _make_envs(env_id, episodes)
+
+    def seed(self, seed):
+        self.envs.reset(seed=seed)
+
+    def __call__(self, agent):
+        """
+        Play one greedy episode per env.
+
+        Args:
+            agent: Agent with a batched test_actions(states) method.
+
+        Returns:
+            List with the total reward of each episode, like test_agent.
+        """
+        states, _ = self.envs.reset()
+        rewards = np.zeros(self.episodes)
+        active = np.ones(self.episodes, dtype=bool)
+        for t in range(self.max_steps):
+            actions = agent.test_actions(states)
+            states, step_rewards, dones, truncateds, _ = self.envs.step(actions)
+            rewards[active] += step_rewards[active]
+            active &= ~(dones | truncateds)
+            if not active.any():
+                break
+        return rewards.tolist()
+
+
+class SequentialEvaluator(BatchedEvaluator):
+    def __init__(self, env_id="CartPole-v1", rounds=(20, 80), threshold=475, delta=0.05, max_steps=500,
+                 step_reward_range=(0, 1)):
+        """
+        BatchedEvaluator that stops as soon as the pass/fail question mean > threshold is decided.
+
+        Episodes are played in rounds, each round side by side in one vector env, and
+        the evaluation stops when
+          - the mean over all sum(rounds) episodes is already certain, even if every unfinished and
+            unplayed episode collected the lowest (or highest) possible reward from
+            here on. This is checked after every step, so a round also ends as soon as
+            its long episodes can no longer change the outcome, or
+          - after a round, a Hoeffding bound separates the mean so far from threshold
+            at error rate delta, split over the rounds so that it holds across the
+            repeated looks.
+        The first rule never changes the outcome of the full evaluation; the second
+        disagrees with the expected reward of the policy with probability at most delta.
+        The default rounds reject weak policies after 20 episodes. A pass this close to
+        the maximum reward can't be decided early without assumptions on the reward
+        distribution, so passing policies play all rounds; since a round costs as many
+        steps as its longest episode, few large rounds keep that close to the cost of
+        one BatchedEvaluator call. Each round size has its own vector env, so a round
+        only steps and evaluates the episodes it plays.
+
+        The returned rewards include the partial rewards of episodes cut short, and
+        their mean is on the same side of threshold as the decision, so callers
+        comparing np.mean(rewards) > threshold need no change.
+
+        Args:
+            env_id: Gymnasium id of the environment to evaluate on.
+            rounds: Episodes per round; their sum is the full evaluation, as test_agent.
+            threshold: Mean reward to compare against.
+            delta: Error rate of the Hoeffding stop, 0 for the certain rule only.
+            max_steps: Step cap per episode.
+            step_reward_range: Bounds of the reward of a single step.
+        """
+        self.max_steps = max_steps
+        self.rounds = list(rounds)
+        self.round_envs = {episodes: _make_envs(env_id, episodes) for episodes in sorted(set(rounds))}
+        self.max_episodes = sum(rounds)
+        self.threshold = threshold
+        self.delta = delta
+        self.step_reward_range = step_reward_range
+        self.episodes_used = []
+
+    def seed(self, seed):
+        # offset by the episodes before each round so that no two rounds start from the same states
+        for i, episodes in enumerate(self.rounds):
+            if self.rounds.index(episodes) == i:
+                self.round_envs[episodes].reset(seed=seed + sum(self.rounds[:i]))
+
+    def _certain(self, total, unplayed, partial=(), steps_left=0):
+        # bounds on the sum over max_episodes: finished total, unfinished partial rewards
+        # with steps_left steps to go, and unplayed episodes of max_steps steps
+        low, high = self.step_reward_range
+        pending = np.sum(partial)
+        steps = len(partial) * steps_left + unplayed * self.max_steps
+        return ((total + pending + steps * low) / self.max_episodes > self.threshold or
+                (total + pending + steps * high) / self.max_episodes <= self.threshold)
+
+    def decided(self, rewards):
+        """Whether the finished episodes settle mean > threshold."""
+        played, total = len(rewards), float(np.sum(rewards))
+        if played >= self.max_episodes or self._certain(total, self.max_episodes - played):
+            return True
+        if self.delta <= 0 or not played:
+            return False
+        low, high = self.step_reward_range
+        margin = self.max_steps * (high - low) * np.sqrt(np.log(2 * len(self.rounds) / self.delta) / (2 * played))
+        return abs(total / played - self.threshold) > margin
+
+    def _round(self, agent, previous, episodes):
+        unplayed = self.max_episodes - len(previous) - episodes
+        total = float(np.sum(previous))
+        envs = self.round_envs[episodes]
+        states, _ = envs.reset()
+        rewards = np.zeros(episodes)
+        active = np.ones(episodes, dtype=bool)
+        for t in range(self.max_steps):
+            actions = agent.test_actions(states)
+            states, step_rewards, dones, truncateds, _ = envs.step(actions)
+            rewards[active] += step_rewards[active]
+            active &= ~(dones | truncateds)
+            if not active.any():
+                break
+            if self._certain(total + rewards[~active].sum(), unplayed, rewards[active], self.max_steps - t - 1):
+                break
+        return rewards.tolist()
+
+    def __call__(self, agent):
+        """
+        Play rounds of greedy episodes until the comparison with threshold is decided.
+
+        Returns:
+            List with the total reward of every episode started, at most sum(rounds).
+            The count is also appended to self.episodes_used.
+        """
+        rewards = []
+        for episodes in self.rounds:
+            if self.decided(rewards):
+                break
+            rewards.extend(self._round(agent, rewards, episodes))
+        self.episodes_used.append(len(rewards))
+        return rewards
@@ -0,0 +1,500 @@
+import functools
+import itertools
+import os
+import time
+
+import numpy as np
+
+from drl.asha import SuccessiveHalving
+from drl.checkpoint import Checkpointer
+from drl.metrics import MetricsLogger
+from drl.profiling import NULL_TIMER, PhaseTimer, ProfilerWindow
+from drl.results import RunStore
+from drl.schedule import UpdateSchedule
+from drl.sweep import config_seed, run_sweep
+
+# torch, gymnasium and the modules built on them (agents, models, training, evaluation,
+# tabular) are imported inside the functions that need them, so that importing this
+# module, starting the CLI and unpickling run_config in a sweep worker stay cheap
+
+# section 1 grid
+Q_LEARNING_RATES = [0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.8]
+Q_EPSILON_DECAYS = [0.0001, 0.001, 0.01, 0.05, 0.1]
+Q_DISCOUNT_FACTORS = [0.9, 0.95, 0.99, 0.999]
+
+# section 2 grid
+LEARNING_RATES = [0.01, 0.0001]
+EPSILON_DECAYS = [0.01, 0.1]
+DISCOUNT_FACTORS = [0.9, 0.99, 0.95]
+BATCH_SIZES = [1024, 2048]
+MODEL_NAMES = ["DQN3Layers", "DQN5Layers"]
+
+
+def dqn_configs():
+    return [
+        {
+            "learning_rate": lr,
+            "epsilon_decay": epsilon_decay,
+            "discount_factor": discount_factor,
+            "batch_size": batch_size,
+            "model": model_name,
+        }
+        for lr in LEARNING_RATES
+        for epsilon_decay in EPSILON_DECAYS
+        for discount_factor in DISCOUNT_FACTORS
+        for batch_size in BATCH_SIZES
+        for model_name in MODEL_NAMES
+    ]
+
+
+def ensemble_groups(configs):
+    """Group configs that can share an EnsembleAgent, i.e. with the same model and batch size."""
+    groups = {}
+    for config in configs:
+        groups.setdefault((config["model"], config["batch_size"]), []).append(config)
+    return [{"model": model, "batch_size": batch_size, "members": members}
+            for (model, batch_size), members in groups.items()]
+
+
+def _run_name(config):
+    return (f"Model={config['model']}_LR={config['learning_rate']}_ED={config['epsilon_decay']}"
+            f"_DF={config['discount_factor']}_BS={config['batch_size']}")
+
+
+def run_config(config, seed, use_wandb=False, log_dir="runs", profile=False, trace_dir=None, schedule=None,
+               checkpoint_dir=None, checkpoint_every=50, episodes=1200, num_envs=1, n_step=1, double_dqn=False,
+               sequential_eval=False, eval_delta=0.05, buffer_size=10000, replay_dir=None, replay_rss_mb=256):
+    """Train one sweep config in a worker process; called by drl.sweep.run_sweep."""
+    import gymnasium as gym
+
+    from drl.agents import CAgent
+    from drl.evaluation import BatchedEvaluator, SequentialEvaluator
+    from drl.models import MODELS
+    from drl.replay import ResidentBudget
+    from drl.training import make_vector_env, train_agent, train_agent_vec
+
+    env = gym.make("CartPole-v1")
+    evaluator = BatchedEvaluator("CartPole-v1", episodes=100)
+    env.reset(seed=seed)
+    env.action_space.seed(seed)
+    evaluator.seed(seed)
+    # the periodic evaluations may stop early, the final test_reward always plays all 100 episodes
+    periodic_evaluator = evaluator
+    if sequential_eval:
+        periodic_evaluator = SequentialEvaluator("CartPole-v1", delta=eval_delta)
+        periodic_evaluator.seed(seed)
+
+    run_name = _run_name(config)
+    # local JSONL log per configuration, mirrored to a Wandb run only with --wandb
+    metrics = MetricsLogger.local(os.path.join(log_dir, run_name), wandb_project="DRL_HW2_Q2" if use_wandb else None,
+                                  run_name=run_name, config=config)
+
+    agent = CAgent(
+        env,
+        MODELS[config["model"]](env.observation_space.shape[0], env.action_space.n),
+        learning_rate=config["learning_rate"],
+        initial_epsilon=1.0,
+        epsilon_decay=config["epsilon_decay"],
+        final_epsilon=0.01,
+        discount_factor=config["discount_factor"],
+        n_step=n_step,
+        double_dqn=double_dqn,
+        buffer_size=buffer_size,
+        replay_dir=os.path.join(replay_dir, run_name) if replay_dir else None,
+        replay_budget=ResidentBudget(replay_rss_mb << 20),
+    )
+    timer = PhaseTimer() if profile else NULL_TIMER
+    profiler = ProfilerWindow(os.path.join(trace_dir, run_name)) if trace_dir is not None else None
+    # rerunning with the same checkpoint_dir resumes the config, or returns at once if it finished
+    checkpointer = Checkpointer(os.path.join(checkpoint_dir, run_name), checkpoint_every) if checkpoint_dir else None
+    start = time.perf_counter()
+
+    if num_envs > 1:
+        envs = make_vector_env(num_envs, asynchronous=True)
+        envs.reset(seed=seed)
+        rewards, losses, first_time_passed = train_agent_vec(envs, agent, episodes=episodes,
+                                                             batch_size=config["batch_size"], target_update_every=2,
+                                                             metrics=metrics, timer=timer, profiler=profiler,
+                                                             schedule=schedule, checkpointer=checkpointer,
+                                                             evaluator=periodic_evaluator)
+    else:
+        rewards, losses, first_time_passed = train_agent(env, agent, episodes=episodes, batch_size=config["batch_size"],
+                                                         target_update_every=2, metrics=metrics, timer=timer,
+                                                         profiler=profiler, schedule=schedule,
+                                                         checkpointer=checkpointer, evaluator=periodic_evaluator)
+    wall_time = time.perf_counter() - start
+    agent.model.eval()
+    test_reward = float(np.mean(evaluator(agent)))
+
+    if profiler is not None:
+        profiler.close()
+    if profile:
+        print(timer.summary())
+        with open(os.path.join(log_dir, run_name, "timing.txt"), "w") as f:
+            f.write(timer.summary() + "\n")
+    metrics.close()
+    return {"avg_reward": float(np.mean(rewards[-100:])), "first_time_passed": first_time_passed,
+            "test_reward": test_reward, "wall_time": wall_time, "rewards": [float(reward) for reward in rewards]}
+
+
+def run_ensemble(group, seed, use_wandb=False, log_dir="runs", profile=False, schedule=None, episodes=1200,
+                 sequential_eval=False, eval_delta=0.05, buffer_size=10000):
+    """
+    Train a group from ensemble_groups as one EnsembleAgent; called by drl.sweep.run_sweep.
+
+    Returns:
+        {"members": [(config, result), ...]} with a run_config result per member, where
+        wall_time is the time of the whole ensemble.
+    """
+    from drl.ensemble import EnsembleAgent, train_ensemble
+    from drl.evaluation import BatchedEvaluator, SequentialEvaluator
+    from drl.models import MODELS
+    from drl.training import make_vector_env
+
+    configs = group["members"]
+    envs = make_vector_env(len(configs))
+    envs.reset(seed=seed)
+    evaluator = BatchedEvaluator("CartPole-v1", episodes=100)
+    evaluator.seed(seed)
+    periodic_evaluator = evaluator
+    if sequential_eval:
+        periodic_evaluator = SequentialEvaluator("CartPole-v1", delta=eval_delta)
+        periodic_evaluator.seed(seed)
+    metrics = [MetricsLogger.local(os.path.join(log_dir, _run_name(config)),
+                                   wandb_project="DRL_HW2_Q2" if use_wandb else None, run_name=_run_name(config),
+                                   config=config)
+               for config in configs]
+    agent = EnsembleAgent(
+        MODELS[group["model"]],
+        envs.single_observation_space.shape[0],
+        envs.single_action_space.n,
+        learning_rates=[config["learning_rate"] for config in configs],
+        epsilon_decays=[config["epsilon_decay"] for config in configs],
+        discount_factors=[config["discount_factor"] for config in configs],
+        initial_epsilon=1.0,
+        final_epsilon=0.01,
+        buffer_size=buffer_size,
+    )
+    timer = PhaseTimer() if profile else NULL_TIMER
+    start = time.perf_counter()
+    runs = train_ensemble(envs, agent, episodes=episodes, batch_size=group["batch_size"], target_update_every=2,
+                          metrics=metrics, timer=timer, schedule=schedule, evaluator=periodic_evaluator)
+    wall_time = time.perf_counter() - start
+
+    results = []
+    for i, (config, (rewards, losses, first_time_passed)) in enumerate(zip(configs, runs)):
+        test_reward = float(np.mean(evaluator(agent.member(i))))
+        results.append((config, {"avg_reward": float(np.mean(rewards[-100:])), "first_time_passed": first_time_passed,
+                                 "test_reward": test_reward, "wall_time": wall_time,
+                                 "rewards": [float(reward) for reward in rewards]}))
+        metrics[i].close()
+    if profile:
+        print(timer.summary())
+    envs.close()
+    return {"members": results}
+
+
+def _schedule(args):
+    return UpdateSchedule(args.train_every, args.gradient_steps, args.warmup, args.target_update_steps)
+
+
+def _dqn_settings(args, episodes=1200):
+    """Everything besides config and seed that a dqn-sweep run's result depends on, for its RunStore key."""
+    return {"episodes": episodes, "num_envs": args.num_envs, "n_step": args.n_step, "double_dqn": args.double_dqn,
+            "schedule": vars(_schedule(args)), "sequential_eval": args.sequential_eval,
+            "eval_delta": args.eval_delta, "buffer_size": args.replay_size,
+            # memory-mapped replay prefetches the next batch, which shifts the sampling draws
+            "replay_dir": args.replay_dir is not None}
+
+
+def _stored(results, store, sweep, settings):
+    """Pass run_sweep results through, putting each into store as it arrives."""
+    for config, result in results:
+        store.put(sweep, config, config_seed(config), settings, result)
+        yield config, result
+
+
+def _periodic_evaluator(args):
+    """SequentialEvaluator with --sequential-eval, else None for the training loop's default."""
+    if not args.sequential_eval:
+        return None
+    from drl.evaluation import SequentialEvaluator
+
+    return SequentialEvaluator("CartPole-v1", delta=args.eval_delta)
+
+
+def qlearning_sweep(args):
+    """Section 1: tabular Q-learning grid on FrozenLake, all configs trained together."""
+    import gymnasium as gym
+
+    from drl.tabular import batched_q_learning
+
+    if args.map_sizes:
+        return map_size_sweep(args)
+    env = gym.make("FrozenLake-v1")
+    grid = list(itertools.product(Q_LEARNING_RATES, Q_EPSILON_DECAYS, Q_DISCOUNT_FACTORS))
+    grid_configs = [{"learning_rate": lr, "epsilon_decay": epsilon_decay, "discount_factor": discount_factor}
+                    for lr, epsilon_decay, discount_factor in grid]
+    settings = {"env": "FrozenLake-v1", "episodes": args.episodes, "start_epsilon": 1, "final_epsilon": 0.0}
+    store = RunStore(args.results_db)
+    # without --seed every run draws fresh randomness, so there is nothing to reuse
+    stored, missing = ([], grid_configs) if args.seed is None or args.rerun else \
+        store.split(grid_configs, [args.seed] * len(grid), settings)
+    print(f"{len(stored)} of {len(grid)} configs found in {args.results_db}, training {len(missing)}")
+    avg_steps = {tuple(config.values()): result["avg_steps"] for config, result in stored}
+    if missing:
+        # each config has its own random stream, so training only the missing ones reproduces the full grid
+        _, missing_steps, _ = batched_q_learning(
+            env, None, None, None, n_episodes=args.episodes, start_epsilon=1, final_epsilon=0.0, seed=args.seed,
+            configs=[tuple(config.values()) for config in missing])
+        for config, steps in zip(missing, missing_steps):
+            store.put("qlearning", config, args.seed, settings, {"avg_steps": float(steps)})
+            avg_steps[tuple(config.values())] = float(steps)
+    store.close()
+    configs = [(lr, 1, epsilon_decay, discount_factor) for lr, epsilon_decay, discount_factor in grid]
+    avg_steps_per_config = np.array([avg_steps[config] for config in grid])
+    # same selection rule as optimize_hyperparameters in sec1.ipynb
+    best = int(np.argmax(avg_steps_per_config))
+    print(f"Best average steps: {avg_steps_per_config[best]}")
+    print(f"Best hyperparameters: {configs[best]}")
+
+
+def map_size_sweep(args):
+    """Section 1 grid on generated maps of each size in --map-sizes, reporting how it scales with the states."""
+    from gymnasium.envs.toy_text.frozen_lake import generate_random_map
+
+    from drl.frozen_lake import FrozenLakeModel
+    from drl.tabular import batched_q_learning
+
+    print(f"{'map':>9} {'states':>7} {'step limit':>10} {'visited':>8} {'Q MiB':>8} {'dense Q MiB':>11} "
+          f"{'model MiB':>9} {'steps/sec':>10} {'min avg steps':>13}")
+    for size in args.map_sizes:
+        model = FrozenLakeModel.from_map(generate_random_map(size, p=args.frozen_prob, seed=args.map_seed))
+        timer = PhaseTimer()
+        start = time.perf_counter()
+        configs, avg_steps_per_config, q_table = batched_q_learning(
+            model, Q_LEARNING_RATES, Q_EPSILON_DECAYS, Q_DISCOUNT_FACTORS, n_episodes=args.episodes,
+            start_epsilon=1, final_epsilon=0.0, seed=args.seed, sparse=True, timer=timer)
+        wall_time = time.perf_counter() - start
+        # lowest average steps to the goal over the configs; the step limit if none ever reached it
+        print(f"{size:>4}x{size:<4} {model.n_states:>7} {model.default_step_limit():>10} {q_table.n_visited:>8} "
+              f"{q_table.nbytes / 2 ** 20:>8.2f} {q_table.dense_nbytes / 2 ** 20:>11.2f} "
+              f"{model.nbytes / 2 ** 20:>9.2f} {timer.counters['env_steps'] / wall_time:>10.0f} "
+              f"{avg_steps_per_config.min():>13.2f}")
+
+
+def dqn_sweep(args):
+    """Section 2: DQN hyperparameter sweep on CartPole, optionally with successive halving."""
+    best_config = None
+    best_avg_reward = -float("inf")
+
+    checkpoint_dir = args.checkpoint_dir
+    if args.asha and checkpoint_dir is None:
+        checkpoint_dir = os.path.join(args.log_dir, "checkpoints")  # promoted configs resume from their rung
+    run = functools.partial(run_config, use_wandb=args.wandb, log_dir=args.log_dir, profile=args.profile,
+                            trace_dir=args.trace_dir, schedule=_schedule(args), checkpoint_dir=checkpoint_dir,
+                            checkpoint_every=args.checkpoint_every, num_envs=args.num_envs, n_step=args.n_step,
+                            double_dqn=args.double_dqn, sequential_eval=args.sequential_eval,
+                            eval_delta=args.eval_delta, buffer_size=args.replay_size, replay_dir=args.replay_dir,
+                            replay_rss_mb=args.replay_rss_mb)
+    configs = dqn_configs()
+    if args.ensemble:
+        if (args.asha or args.checkpoint_dir or args.num_envs > 1 or args.n_step > 1 or args.double_dqn
+                or args.replay_dir):
+            raise ValueError("--ensemble does not support --asha, --checkpoint-dir, --num-envs, --n-step, "
+                             "--double-dqn or --replay-dir")
+        run = functools.partial(run_ensemble, use_wandb=args.wandb, log_dir=args.log_dir, profile=args.profile,
+                                schedule=_schedule(args), sequential_eval=args.sequential_eval,
+                                eval_delta=args.eval_delta, buffer_size=args.replay_size)
+        groups = run_sweep(run, ensemble_groups(configs), workers=args.workers,
+                           threads_per_worker=args.threads_per_worker)
+        results = (member for _, result in groups for member in result["members"])
+        full_episodes = 1200
+    elif args.asha:
+        halving = SuccessiveHalving(args.rungs, args.keep)
+        results = halving.run(run, configs, workers=args.workers, threads_per_worker=args.threads_per_worker)
+        full_episodes = args.rungs[-1]
+    else:
+        # only the plain sweep consults the store: ensemble members depend on their group, ASHA results on the rung
+        settings = _dqn_settings(args)
+        store = RunStore(args.results_db)
+        stored, missing = ([], configs) if args.rerun else \
+            store.split(configs, [config_seed(config) for config in configs], settings)
+        print(f"{len(stored)} of {len(configs)} configs found in {args.results_db}, training {len(missing)}")
+        trained = run_sweep(run, missing, workers=args.workers, threads_per_worker=args.threads_per_worker) \
+            if missing else ()
+        results = itertools.chain(stored, _stored(trained, store, "dqn", settings))
+        full_episodes = 1200
+    for config, result in results:
+        avg_reward, episodes = result["avg_reward"], result.get("episodes", full_episodes)
+        if episodes == full_episodes and avg_reward > best_avg_reward:
+            best_avg_reward = avg_reward
+            best_config = config
+
+        lr, epsilon_decay, discount_factor = config["learning_rate"], config["epsilon_decay"], config["discount_factor"]
+        batch_size, model_name = config["batch_size"], config["model"]
+        print(f"Config: LR={lr}, ED={epsilon_decay}, DF={discount_factor}, BS={batch_size}, Model={model_name}")
+        print(f"Episodes: {episodes}, Average Reward: {avg_reward}, First Time Passed: {result['first_time_passed']}, "
+              f"Wall Time: {result['wall_time']:.1f}s, Best Reward: {best_avg_reward}")
+        with open("results.txt", "a") as f:
+            f.write(f"Config: LR={lr}, ED={epsilon_decay}, DF={discount_factor}, BS={batch_size}, Model={model_name}\n")
+            f.write(f"Episodes: {episodes}, Average Reward: {avg_reward}, First Time Passed: {result['first_time_passed']}, "
+                    f"Wall Time: {result['wall_time']:.1f}s, Best Reward: {best_avg_reward}\n")
+
+    print(f"Best Configuration: {best_config}")
+    if not (args.ensemble or args.asha):
+        store.close()
+    if args.asha:
+        print(halving.summary())
+
+
+def per_run(args):
+    """Section 3: one DQN5Layers run with prioritized replay, or uniform replay with --uniform."""
+    import gymnasium as gym
+
+    from drl.agents import CAgent, CAgentIS
+    from drl.models import DQN5Layers
+    from drl.replay import ResidentBudget
+    from drl.training import train_agent, train_agentIS
+
+    env = gym.make("CartPole-v1")
+    # hyperparameters: Model=DQN5Layers_LR=0.0001_ED=0.1_DF=0.95_BS=1024
+    agent_class, train, run_name = CAgentIS, train_agentIS, "Importance Sampling"
+    if args.uniform:
+        agent_class, train, run_name = CAgent, train_agent, "No Importance Sampling"
+    agent = agent_class(
+        env,
+        DQN5Layers(env.observation_space.shape[0], env.action_space.n),
+        learning_rate=0.01,
+        initial_epsilon=1.0,
+        epsilon_decay=0.1,
+        final_epsilon=0.01,
+        discount_factor=0.95,
+        n_step=args.n_step,
+        double_dqn=args.double_dqn,
+        buffer_size=args.replay_size,
+        replay_dir=args.replay_dir,
+        replay_budget=ResidentBudget(args.replay_rss_mb << 20),
+    )
+    metrics = MetricsLogger.local(os.path.join(args.log_dir, run_name.lower().replace(" ", "_")),
+                                  wandb_project="DRL_HW1_Q3" if args.wandb else None, run_name=run_name)
+    timer = PhaseTimer() if args.profile else NULL_TIMER
+    profiler = ProfilerWindow(args.trace_dir) if args.trace_dir is not None else None
+    checkpointer = Checkpointer(args.checkpoint_dir, args.checkpoint_every) if args.checkpoint_dir else None
+    train(env, agent, 1200, 1024, 2, metrics=metrics, timer=timer, profiler=profiler, schedule=_schedule(args),
+          checkpointer=checkpointer, evaluator=_periodic_evaluator(args))
+    if profiler is not None:
+        profiler.close()
+    if args.profile:
+        print(timer.summary())
+    metrics.close()
+
+
+def distributed_run(args):
+    """Section 3 uniform-replay DQN trained by several actor processes and one learner."""
+    import gymnasium as gym
+
+    from drl.agents import CAgent
+    from drl.distributed import train_distributed
+    from drl.models import DQN5Layers
+
+    if args.n_step > 1:
+        raise ValueError("the actors write 1-step transitions, --n-step is not supported")
+    if args.replay_dir:
+        raise ValueError("the actors share an in-memory replay ring, --replay-dir is not supported")
+    env = gym.make("CartPole-v1")
+    agent = CAgent(
+        env,
+        DQN5Layers(env.observation_space.shape[0], env.action_space.n),
+        learning_rate=0.01,
+        initial_epsilon=1.0,
+        epsilon_decay=0.1,
+        final_epsilon=0.01,
+        discount_factor=0.95,
+        double_dqn=args.double_dqn,
+        buffer_size=args.replay_size,
+    )
+    run_name = f"distributed_{args.actors}_actors"
+    metrics = MetricsLogger.local(os.path.join(args.log_dir, run_name),
+                                  wandb_project="DRL_HW1_Q3" if args.wandb else None, run_name=run_name)
+    # always timed, the summary reports env steps/sec and updates/sec for the actor count
+    timer = PhaseTimer()
+    rewards, losses, first_time_passed = train_distributed(agent, args.episodes, 1024, 2, num_actors=args.actors,
+                                                           metrics=metrics, timer=timer, schedule=_schedule(args),
+                                                           evaluator=_periodic_evaluator(args),
+                                                           seed=args.seed, push_every=args.push_every,
+                                                           pull_every=args.pull_every,
+                                                           max_lead=args.max_lead if args.max_lead >= 0 else None)
+    print(f"Average Reward: {np.mean(rewards[-100:])}, First Time Passed: {first_time_passed}")
+    print(timer.summary())
+    metrics.close()
+
+
+def serve(args):
+    """Serve the greedy actions of a trained DQN until interrupted."""
+    import torch
+
+    from drl.serving import load_model, make_server
+
+    torch.set_num_threads(1)
+    model, model_name = load_model(args.checkpoint, args.model)
+    server = make_server(model, model_name, args.host, args.port, args.max_batch_size, args.max_delay_ms / 1e3)
+    print(f"serving {model_name} from {args.checkpoint} on http://{args.host}:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.batcher.close()
+
+
+def export(args):
+    """Export a trained DQN as frozen TorchScript policies and compare them with the fp32 model."""
+    import torch
+
+    from drl.evaluation import BatchedEvaluator
+    from drl.export import ExportedPolicy, compare_policies, export_policy, rollout_states
+    from drl.inference import NumpyPolicy
+    from drl.serving import load_model
+
+    torch.set_num_threads(1)
+    model, model_name = load_model(args.checkpoint, args.model)
+    os.makedirs(args.out, exist_ok=True)
+    policies = {"numpy": NumpyPolicy(model), "torchscript": export_policy(model, os.path.join(args.out, "policy.pt"))}
+    if args.quantize:
+        policies["torchscript int8"] = export_policy(model, os.path.join(args.out, "policy_int8.pt"), quantize=True)
+    report = compare_policies(model, policies, rollout_states(policies["numpy"], n_states=args.states, seed=args.seed))
+
+    evaluator = BatchedEvaluator("CartPole-v1", episodes=args.episodes)
+    # test_agent/BatchedEvaluator only need test_actions, which ExportedPolicy also gives the eager model
+    agents = {"fp32 eager": ExportedPolicy(model)}
+    agents.update((name, policy) for name, policy in policies.items() if isinstance(policy, ExportedPolicy))
+    print(f"{model_name} from {args.checkpoint}, exported to {args.out}")
+    print(f"{'variant':<18}{'size KiB':>10}{'1 state us':>12}{'100 states us':>15}{'agreement':>11}"
+          f"{'max |dQ|':>10}{'test reward':>13}")
+    for name, row in report.items():
+        reward = ""
+        if name in agents:
+            evaluator.seed(args.seed)
+            reward = f"{np.mean(evaluator(agents[name])):.1f}"
+        size = f"{row['size_bytes'] / 1024:.1f}" if row["size_bytes"] is not None else "-"
+        print(f"{name:<18}{size:>10}{row['single_us']:>12.1f}{row['batch_us']:>15.1f}{row['agreement']:>11.4f}"
+              f"{row['max_q_error']:>10.4f}{reward:>13}")
+
+
+def results(args):
+    """Query the RunStore of the sweeps."""
+    store = RunStore(args.results_db)
+    version = store.version if args.current else None
+    metric = args.metric or {"dqn": "avg_reward", "qlearning": "avg_steps"}[args.sweep]
+    if args.best_per_model:
+        rows = store.best_per_model(args.sweep, metric, args.ascending, version)
+    else:
+        rows = store.top_k(args.sweep, args.top, metric, args.ascending, version)
+    store.close()
+    for row in rows:
+        metrics = {name: value for name, value in row.items() if name not in ("key", "model", "config", "seed")}
+        print(f"{row['model'] or args.sweep}: {row['config']} seed={row['seed']}")
+        print("    " + ", ".join(f"{name}={value:.4g}" if isinstance(value, float) else f"{name}={value}"
+                                 for name, value in metrics.items()))
@@ -0,0 +1,181 @@
+import copy
+import io
+import time
+import warnings
+
+import numpy as np
+import torch
+from torch import nn
+
+
+class ExportedPolicy:
+    def __init__(self, module):
+        """
+        Greedy policy backed by a frozen TorchScript module, e.g. from export_policy.
+
+        Exposes the test_action/test_actions interface of CAgent, so test_agent and
+        BatchedEvaluator run it in place of an agent.
+
+        Args:
+            module: Module mapping [batch, features] states to Q-values, normally the
+                frozen ScriptModule of export_policy.
+        """
+        self.module = module
+
+    @classmethod
+    def load(cls, path):
+        """Load a policy saved by export_policy."""
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", FutureWarning)
+            return cls(torch.jit.load(path, map_location="cpu"))
+
+    def q_values(self, states):
+        """Q-values of a batch of states [batch, features] as a NumPy array."""
+        with torch.inference_mode():
+            return self.module(torch.as_tensor(np.asarray(states, dtype=np.float32))).numpy()
+
+    def act(self, state):
+        """Greedy action for a single state."""
+        with torch.inference_mode():
+            return int(self.module(torch.as_tensor(np.asarray(state, dtype=np.float32)).unsqueeze(0)).argmax())
+
+    def act_batch(self, states):
+        """Greedy actions for a batch of states."""
+        return self.q_values(states).argmax(axis=1)
+
+    test_action = act
+    test_actions = act_batch
+
+
+def export_policy(model, path=None, quantize=False):
+    """
+    Trace a DQN into a frozen TorchScript policy for CPU inference.
+
+    Freezing inlines the weights as constants and drops the Python module hierarchy,
+    so a forward pass no longer dispatches through nn.Module.__call__ per layer. With
+    quantize, the Linear layers are first replaced by dynamically quantized int8
+    versions (weights stored as int8, activations quantized per call), which
+    shrinks the weights about 4x.
+
+    Args:
+        model: Trained model, e.g. CAgent.model; it is copied to the CPU and left unchanged.
+        path: If given, torch.jit.save the policy there.
+        quantize: Apply torch's dynamic int8 quantization to the Linear layers.
+
+    Returns:
+        ExportedPolicy wrapping the frozen module.
+    """
+    model = copy.deepcopy(model).cpu().eval()
+    example = torch.zeros(1, _state_size(model))
+    with warnings.catch_warnings():
+        # torch.ao.quantization and torch.jit warn that they are deprecated in favour of torchao and torch.export
+        warnings.simplefilter("ignore", DeprecationWarning)
+        warnings.simplefilter("ignore", FutureWarning)
+        warnings.simplefilter("ignore", UserWarning)
+        if quantize:
+            model = torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+        with torch.no_grad():
+            module = torch.jit.freeze(torch.jit.trace(model, example))
+        if path is not None:
+            torch.jit.save(module, path)
+    return ExportedPolicy(module)
+
+
+def _state_size(model):
+    for module in model.modules():
+        if hasattr(module, "in_features"):
+            return module.in_features
+    raise TypeError(f"{type(model).__name__} has no Linear layer to infer the state size from")
+
+
+def _serialized_bytes(policy):
+    buffer = io.BytesIO()
+    if isinstance(policy, ExportedPolicy):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", FutureWarning)
+            torch.jit.save(policy.module, buffer)
+    else:
+        torch.save(policy.state_dict(), buffer)
+    return buffer.getbuffer().nbytes
+
+
+def _time_us(function, argument, calls):
+    function(argument)
+    start = time.perf_counter()
+    for _ in range(calls):
+        function(argument)
+    return 1e6 * (time.perf_counter() - start) / calls
+
+
+def rollout_states(policy, env_id="CartPole-v1", n_states=10000, num_envs=16, seed=0):
+    """
+    States visited by the greedy policy, to compare exported variants on in-distribution inputs.
+
+    Args:
+        policy: Object with act_batch(states), e.g. a NumpyPolicy of the fp32 model.
+        env_id: Gymnasium id of the environment.
+        n_states: Number of states to collect.
+        num_envs: Episodes run side by side in a vector env.
+        seed: Seed of the vector env.
+
+    Returns:
+        Float32 array of shape [n_states, features].
+    """
+    import gymnasium as gym
+
+    envs = gym.make_vec(env_id, num_envs=num_envs, vectorization_mode="sync")
+    states, _ = envs.reset(seed=seed)
+    collected = []
+    for _ in range(-(-n_states // num_envs)):
+        collected.append(states.astype(np.float32))
+        states, _, _, _, _ = envs.step(policy.act_batch(states))
+    envs.close()
+    return np.concatenate(collected)[:n_states]
+
+
+def compare_policies(model, policies, states, calls=2000, batch_size=100):
+    """
+    Action agreement, Q-value drift, latency and size of policies relative to the fp32 eager model.
+
+    Args:
+        model: The fp32 model the policies were exported from.
+        policies: Dict of name to policy with act/act_batch/q_values, e.g. ExportedPolicy
+            or NumpyPolicy.
+        states: States [n, features] to compare the greedy actions on, e.g. from rollout_states.
+        calls: Calls per latency measurement.
+        batch_size: States per call of the batched latency measurement.
+
+    Returns:
+        Dict of name to a dict with agreement (fraction of states with the fp32 action),
+        max_q_error, single_us (act on one state), batch_us (act_batch on batch_size
+        states) and size_bytes (serialized size, None for policies without one). The
+        fp32 eager model itself is included as "fp32 eager".
+    """
+    model = copy.deepcopy(model).cpu().eval()
+    states = np.asarray(states, dtype=np.float32)
+    with torch.inference_mode():
+        reference = model(torch.from_numpy(states)).numpy()
+
+    def eager_act(state):
+        with torch.inference_mode():
+            return int(model(torch.as_tensor(state).unsqueeze(0)).argmax())
+
+    def eager_act_batch(batch):
+        with torch.inference_mode():
+            return model(torch.as_tensor(batch)).argmax(dim=1).numpy()
+
+    rows = {"fp32 eager": (eager_act, eager_act_batch, reference, _serialized_bytes(model))}
+    for name, policy in policies.items():
+        size = _serialized_bytes(policy) if isinstance(policy, ExportedPolicy) else None
+        rows[name] = (policy.act, policy.act_batch, policy.q_values(states), size)
+
+    report = {}
+    for name, (act, act_batch, q_values, size) in rows.items():
+        report[name] = {
+            "agreement": float(np.mean(q_values.argmax(axis=1) == reference.argmax(axis=1))),
+            "max_q_error": float(np.abs(q_values - reference).max()),
+            "single_us": _time_us(act, states[0], calls),
+            "batch_us": _time_us(act_batch, states[:batch_size], calls),
+            "size_bytes": size,
+        }
+    return report
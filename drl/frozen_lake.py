@@ -0,0 +1,215 @@
+import numpy as np
+
+# FrozenLake-v1 actions as (row, column) moves: LEFT, DOWN, RIGHT, UP
+_MOVES = np.array([[0, -1], [1, 0], [0, 1], [-1, 0]])
+
+
+class FrozenLakeModel:
+    def __init__(self, probs, next_states, rewards, terminated, initial_distribution, map_shape=None):
+        """
+        Tabular model of a discrete toy-text env as dense arrays.
+
+        All transition arrays have shape [states, actions, outcomes]; (state, action)
+        pairs with fewer outcomes than the maximum are padded with zero-probability
+        entries. Batches of transitions are sampled straight from these arrays, and the
+        same arrays give exact dynamic-programming solutions.
+
+        Args:
+            probs: Probability of each outcome.
+            next_states: Next state of each outcome.
+            rewards: Reward of each outcome.
+            terminated: Whether each outcome ends the episode.
+            initial_distribution: Probability of starting in each state.
+            map_shape: (rows, columns) of a FrozenLake map, if the model is one.
+        """
+        self.probs = probs
+        self.next_states = next_states
+        self.rewards = rewards
+        self.terminated = terminated
+        self.initial_distribution = initial_distribution
+        self.map_shape = map_shape
+        self.n_states, self.n_actions, self.n_outcomes = probs.shape
+        self.expected_rewards = (probs * rewards).sum(axis=2)
+        self._initial_cdf = np.cumsum(initial_distribution)
+        self._initial_cdf /= self._initial_cdf[-1]
+
+        # flattened (state, action) tables for the sampling hot path
+        self._cum_probs = np.cumsum(probs, axis=2).reshape(-1, self.n_outcomes)
+        self._outcomes = np.stack([next_states, rewards, terminated], axis=-1).reshape(-1, 3)
+
+    @classmethod
+    def from_env(cls, env):
+        """Extract the transition model exposed as env.unwrapped.P, e.g. by FrozenLake-v1."""
+        P = env.unwrapped.P
+        n_states, n_actions = env.observation_space.n, env.action_space.n
+        n_outcomes = max(len(P[s][a]) for s in range(n_states) for a in range(n_actions))
+        probs = np.zeros((n_states, n_actions, n_outcomes))
+        next_states = np.zeros((n_states, n_actions, n_outcomes), dtype=np.int64)
+        rewards = np.zeros((n_states, n_actions, n_outcomes))
+        terminated = np.ones((n_states, n_actions, n_outcomes), dtype=bool)
+        for s in range(n_states):
+            for a in range(n_actions):
+                for k, (p, s_next, r, term) in enumerate(P[s][a]):
+                    probs[s, a, k], next_states[s, a, k], rewards[s, a, k], terminated[s, a, k] = p, s_next, r, term
+        desc = getattr(env.unwrapped, "desc", None)
+        return cls(probs, next_states, rewards, terminated, np.asarray(env.unwrapped.initial_state_distrib),
+                   desc.shape if desc is not None else None)
+
+    @classmethod
+    def from_map(cls, desc, is_slippery=True):
+        """
+        Build the model of FrozenLake-v1 on the map desc with array operations.
+
+        Gives the same arrays as from_env(gym.make("FrozenLake-v1", desc=desc)) without
+        building the env's per-state transition lists, which takes seconds on large
+        generated maps.
+
+        Args:
+            desc: Map as a list of row strings, e.g. from generate_random_map.
+            is_slippery: As in FrozenLake-v1.
+        """
+        desc = np.asarray(desc, dtype="c")
+        n_rows, n_cols = desc.shape
+        cells = desc.ravel()
+        states = np.arange(n_rows * n_cols)
+        absorbing = (cells == b"G") | (cells == b"H")
+
+        # a slippery move goes in the chosen direction with probability 1/3, else to either side
+        # (with gymnasium's (1 - 1/3) / 2 rounding for the sides)
+        offsets = np.array([-1, 0, 1]) if is_slippery else np.array([0])
+        offset_probs = np.array([(1 - 1 / 3) / 2, 1 / 3, (1 - 1 / 3) / 2]) if is_slippery else np.array([1.0])
+        directions = (np.arange(len(_MOVES))[:, None] + offsets) % len(_MOVES)
+        next_rows = np.clip(states[:, None, None] // n_cols + _MOVES[directions, 0], 0, n_rows - 1)
+        next_cols = np.clip(states[:, None, None] % n_cols + _MOVES[directions, 1], 0, n_cols - 1)
+        next_states = next_rows * n_cols + next_cols
+        probs = np.broadcast_to(offset_probs, next_states.shape).copy()
+        rewards = (cells[next_states] == b"G").astype(np.float64)
+        terminated = absorbing[next_states]
+
+        # goals and holes stay put with a single outcome, the rest is padding as in from_env
+        probs[absorbing] = 0.0
+        probs[absorbing, :, 0] = 1.0
+        next_states[absorbing] = 0
+        next_states[absorbing, :, 0] = states[absorbing, None]
+        rewards[absorbing] = 0.0
+        terminated[absorbing] = True
+
+        initial_distribution = (cells == b"S").astype(np.float64)
+        initial_distribution /= initial_distribution.sum()
+        return cls(probs, next_states, rewards, terminated, initial_distribution, (n_rows, n_cols))
+
+    @property
+    def nbytes(self):
+        """Bytes of the transition arrays."""
+        return sum(array.nbytes for array in (self.probs, self.next_states, self.rewards, self.terminated,
+                                              self.expected_rewards, self._cum_probs, self._outcomes))
+
+    def default_step_limit(self):
+        """
+        Episode step cap that grows with the map: 12.5 steps per row plus column, which
+        gives the max_episode_steps gymnasium registers for the 4x4 (100) and 8x8 (200)
+        maps. Models without a map_shape get 100.
+        """
+        if self.map_shape is None:
+            return 100
+        return int(12.5 * sum(self.map_shape))
+
+    def reset(self, n, rng):
+        """Sample n initial states."""
+        return self.initial_states(rng.random(n))
+
+    def initial_states(self, uniforms):
+        """Initial states picked by an array of uniform [0, 1) draws."""
+        # rng.choice(n_states, size=n, p=initial_distribution) without its O(states) cumsum per call
+        return self._initial_cdf.searchsorted(uniforms, side="right")
+
+    def step(self, states, actions, uniforms):
+        """
+        Sample one transition for each (state, action) pair.
+
+        Args:
+            states: Array of current states.
+            actions: Array of actions.
+            uniforms: Uniform [0, 1) draws of shape [len(states), 1] that pick the outcomes.
+
+        Returns:
+            A tuple of (next_states, rewards, terminated) arrays.
+        """
+        state_actions = states * self.n_actions + actions
+        outcome = np.minimum((uniforms > self._cum_probs[state_actions]).sum(axis=1), self.n_outcomes - 1)
+        next_states, rewards, terminated = self._outcomes[state_actions * self.n_outcomes + outcome].T
+        return next_states.astype(np.int64), rewards, terminated.astype(bool)
+
+    def sample(self, states, actions, rng):
+        """Like step, drawing the outcome uniforms from rng."""
+        return self.step(states, actions, rng.random((len(states), 1)))
+
+    def _backup(self, values, discount):
+        """Q-values one Bellman backup away from state values of shape [..., states]."""
+        continuation = ~self.terminated * values[..., self.next_states]
+        return self.expected_rewards + discount * (self.probs * continuation).sum(axis=-1)
+
+    def value_iteration(self, discount=0.95, horizon=None, tol=1e-10, max_iterations=100_000):
+        """
+        Optimal Q-values of the model.
+
+        Args:
+            discount: Discount factor.
+            horizon: If set, solve the finite-horizon problem with this many steps left
+                instead of iterating to convergence. With discount=1 and FrozenLake's goal
+                reward this is the best achievable probability of reaching the goal
+                within horizon steps.
+            tol: Convergence threshold on the largest Q-value change.
+            max_iterations: Iteration cap for the infinite-horizon case.
+
+        Returns:
+            Array of shape [states, actions].
+        """
+        q_values = np.zeros((self.n_states, self.n_actions))
+        for _ in range(horizon if horizon is not None else max_iterations):
+            new_q_values = self._backup(q_values.max(axis=1), discount)
+            delta = np.abs(new_q_values - q_values).max()
+            q_values = new_q_values
+            if horizon is None and delta < tol:
+                break
+        return q_values
+
+    def policy_values(self, policies, discount=0.95, horizon=None, tol=1e-10, max_iterations=100_000):
+        """
+        State values of a batch of deterministic policies.
+
+        Args:
+            policies: Actions per state, shape [states] or [policies, states].
+            discount, horizon, tol, max_iterations: As in value_iteration.
+
+        Returns:
+            Array of state values with the same shape as policies.
+        """
+        policies = np.asarray(policies)
+        values = np.zeros(policies.shape)
+        for _ in range(horizon if horizon is not None else max_iterations):
+            q_values = self._backup(values, discount)
+            new_values = np.take_along_axis(q_values, policies[..., None], axis=-1)[..., 0]
+            delta = np.abs(new_values - values).max()
+            values = new_values
+            if horizon is None and delta < tol:
+                break
+        return values
+
+    def distance_to_optimal(self, q_values, discount=0.95, horizon=None):
+        """
+        Gap between the optimal start-state value and that of the greedy policy of each Q-table.
+
+        Args:
+            q_values: Q-tables of shape [states, actions] or [configs, states, actions].
+            discount, horizon: As in value_iteration.
+
+        Returns:
+            Value gap per Q-table. Without a horizon 0 means the greedy policy is optimal;
+            the finite-horizon optimum is non-stationary, so there even the best greedy
+            policy can show a small gap.
+        """
+        q_values = np.asarray(q_values)
+        optimal_values = self.value_iteration(discount, horizon).max(axis=1)
+        policy_values = self.policy_values(q_values.argmax(axis=-1), discount, horizon)
+        return (optimal_values - policy_values) @ self.initial_distribution
@@ -0,0 +1,132 @@
+import json
+import os
+import queue
+import threading
+import time
+
+
+class JsonlBackend:
+    def __init__(self, path):
+        """Appends every record as one JSON line; works without network access."""
+        self.path = path
+
+    def open(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self.file = open(self.path, "a")
+
+    def write(self, records):
+        self.file.write("".join(json.dumps(record, default=float) + "\n" for record in records))
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ConsoleBackend:
+    def __init__(self, every=10):
+        """Prints every n-th episode record instead of every episode."""
+        self.every = every
+
+    def open(self):
+        pass
+
+    def write(self, records):
+        for record in records:
+            if record.get("episode", 0) % self.every == 0 and "Reward" in record:
+                print(f"Episode {record['episode']} - Reward: {record['Reward']}, Loss: {record.get('Loss', float('nan')):.4f}")
+
+    def close(self):
+        pass
+
+
+class WandbBackend:
+    def __init__(self, project, name=None, config=None):
+        """Forwards records to Weights & Biases. wandb is only imported once the writer thread starts."""
+        self.project = project
+        self.name = name
+        self.config = config
+
+    def open(self):
+        import wandb
+
+        self.run = wandb.init(project=self.project, name=self.name, config=self.config, reinit=True)
+
+    def write(self, records):
+        for record in records:
+            self.run.log({key: value for key, value in record.items() if key not in ("time", "episode")})
+
+    def close(self):
+        self.run.finish()
+
+
+class MetricsLogger:
+    def __init__(self, backends, flush_interval=2.0):
+        """
+        Non-blocking scalar logger with a background writer thread.
+
+        log() only puts the record on a queue. The writer thread drains the queue, and
+        every flush_interval seconds hands the batch to each backend (local JSONL, console,
+        optionally W&B), so slow disks or network never stall the training loop.
+
+        Args:
+            backends: Backend objects with open(), write(records) and close().
+            flush_interval: Seconds between batched writes.
+        """
+        self.backends = backends
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def local(cls, run_dir, print_every=10, wandb_project=None, run_name=None, config=None, **kwargs):
+        """Logger writing run_dir/metrics.jsonl, with W&B added only when wandb_project is given."""
+        backends = [JsonlBackend(os.path.join(run_dir, "metrics.jsonl"))]
+        if print_every:
+            backends.append(ConsoleBackend(print_every))
+        if wandb_project is not None:
+            backends.append(WandbBackend(wandb_project, run_name, config))
+        return cls(backends, **kwargs)
+
+    def log(self, metrics, episode=None):
+        record = dict(metrics, time=time.time())
+        if episode is not None:
+            record["episode"] = episode
+        self._queue.put(record)
+
+    def _run(self):
+        for backend in self.backends:
+            backend.open()
+        closing = False
+        while not closing:
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while (timeout := deadline - time.monotonic()) > 0:
+                try:
+                    record = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if record is None:
+                    closing = True
+                    break
+                batch.append(record)
+            if batch:
+                for backend in self.backends:
+                    backend.write(batch)
+        for backend in self.backends:
+            backend.close()
+
+    def close(self):
+        """Flush everything still queued and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+
+class NullMetrics:
+    """Stand-in for MetricsLogger that drops everything."""
+
+    def log(self, metrics, episode=None):
+        pass
+
+    def close(self):
+        pass
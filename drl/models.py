@@ -0,0 +1,42 @@
+import torch.nn as nn
+
+
+class DQN3Layers(nn.Module):
+    def __init__(self, state_size, action_size=2):
+        super(DQN3Layers, self).__init__()
+        self.network = nn.Sequential(
+            nn.Linear(state_size, 32),  # Input layer to first hidden layer
+            nn.ReLU(),
+            nn.Linear(32, 32),  # First hidden layer to second hidden layer
+            nn.ReLU(),
+            nn.Linear(32, 32),  # Second hidden layer to third hidden layer
+            nn.ReLU(),
+            nn.Linear(32, action_size)  # Third hidden layer to output layer
+        )
+
+    def forward(self, state):
+        return self.network(state)
+
+
+class DQN5Layers(nn.Module):
+    def __init__(self, state_size, action_size=2):
+        super(DQN5Layers, self).__init__()
+        self.network = nn.Sequential(
+            nn.Linear(state_size, 32),  # Input layer to first hidden layer
+            nn.ReLU(),
+            nn.Linear(32, 32),  # First hidden layer to second hidden layer
+            nn.ReLU(),
+            nn.Linear(32, 32),  # Second hidden layer to third hidden layer
+            nn.ReLU(),
+            nn.Linear(32, 32),  # Third hidden layer to fourth hidden layer
+            nn.ReLU(),
+            nn.Linear(32, 32),  # Fourth hidden layer to fifth hidden layer
+            nn.ReLU(),
+            nn.Linear(32, action_size)  # Fifth hidden layer to output layer
+        )
+
+    def forward(self, state):
+        return self.network(state)
+
+
+MODELS = {model.__name__: model for model in (DQN3Layers, DQN5Layers)}
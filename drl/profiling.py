@@ -0,0 +1,114 @@
+import contextlib
+import os
+import time
+from collections import defaultdict
+
+
+class _Phase:
+    __slots__ = ("timer", "name", "start")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timer.totals[self.name] += time.perf_counter() - self.start
+        self.timer.calls[self.name] += 1
+
+
+class PhaseTimer:
+    def __init__(self):
+        """
+        Cumulative wall time and call counts per named phase of the training loop.
+
+            with timer.phase("env_step"):
+                env.step(action)
+            timer.count("env_steps")
+
+        Phase objects are cached per name, so an enabled timer costs two perf_counter
+        calls per phase. Use NULL_TIMER when instrumentation is off.
+        """
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+        self._phases = {}
+        self.started = time.perf_counter()
+
+    def phase(self, name):
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self, name)
+        return phase
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def reset(self):
+        self.__init__()
+
+    def summary(self):
+        """Table of phases sorted by total time, followed by steps/sec and updates/sec."""
+        wall = time.perf_counter() - self.started
+        lines = [f"{'phase':<20}{'total s':>10}{'calls':>10}{'mean us':>10}{'% wall':>8}"]
+        for name, total in sorted(self.totals.items(), key=lambda item: -item[1]):
+            calls = self.calls[name]
+            lines.append(f"{name:<20}{total:>10.3f}{calls:>10}{1e6 * total / calls:>10.1f}{100 * total / wall:>8.1f}")
+        lines.append(f"wall time {wall:.3f} s, env steps/sec {self.counters['env_steps'] / wall:.1f}, "
+                     f"updates/sec {self.counters['updates'] / wall:.1f}")
+        return "\n".join(lines)
+
+
+class _NullTimer:
+    """PhaseTimer interface that records nothing."""
+
+    _phase = contextlib.nullcontext()
+
+    def phase(self, name):
+        return self._phase
+
+    def count(self, name, n=1):
+        pass
+
+    def reset(self):
+        pass
+
+    def summary(self):
+        return ""
+
+
+NULL_TIMER = _NullTimer()
+
+
+class ProfilerWindow:
+    def __init__(self, trace_dir, start_step=1000, active_steps=200):
+        """
+        torch.profiler session over a window of env steps, exported as a Chrome trace.
+
+        Call step() once per env step; the profiler records steps
+        [start_step, start_step + active_steps) and writes trace_dir/trace.json, which
+        opens in chrome://tracing or Perfetto.
+
+        Args:
+            trace_dir: Directory for the trace file.
+            start_step: Env steps to skip before recording (one more is used as warmup).
+            active_steps: Env steps to record.
+        """
+        from torch.profiler import ProfilerActivity, profile, schedule
+
+        os.makedirs(trace_dir, exist_ok=True)
+        self.trace_path = os.path.join(trace_dir, "trace.json")
+        self.profiler = profile(
+            activities=[ProfilerActivity.CPU],
+            schedule=schedule(wait=max(start_step - 1, 0), warmup=1, active=active_steps, repeat=1),
+            on_trace_ready=lambda prof: prof.export_chrome_trace(self.trace_path),
+        )
+        self.profiler.start()
+
+    def step(self):
+        self.profiler.step()
+
+    def close(self):
+        self.profiler.stop()
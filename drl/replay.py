@@ -0,0 +1,788 @@
+import collections
+import json
+import mmap
+import os
+import shutil
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# entries of a memory-mapped column written per step while filling it
+_FILL_CHUNK = 1 << 20
+# a read fault maps the cached pages around the faulting one too, up to Linux's default fault_around_bytes
+_FAULT_BYTES = 16 * mmap.PAGESIZE
+
+
+class ResidentBudget:
+    def __init__(self, max_bytes=256 << 20):
+        """
+        One resident-set budget shared by all memory-mapped replay columns of a process.
+
+        Every page of a file mapping that is read or written stays in the resident set
+        until the kernel needs it back, so a buffer sampled at random would end up with
+        its whole files resident. Mapped columns register here, and readers and writers
+        charge the bytes of the pages they touch. Once the charges exceed max_bytes, every
+        registered mapping is dropped from the resident set with madvise(MADV_DONTNEED).
+        The data stays in the files and the page cache, so a release only costs page
+        faults on the next reads.
+
+        Args:
+            max_bytes: Resident bytes allowed between releases.
+        """
+        self.max_bytes = max_bytes
+        self.charged = 0
+        self.releases = 0
+        self._columns = []
+        self._lock = threading.Lock()
+
+    def register(self, column):
+        """Track an np.memmap for release; it is forgotten once garbage collected."""
+        if hasattr(mmap, "MADV_RANDOM"):
+            # without it every fault maps and reads ahead the neighbouring pages of a sampled row
+            column._mmap.madvise(mmap.MADV_RANDOM)
+        with self._lock:
+            self._columns = [ref for ref in self._columns if ref() is not None]
+            self._columns.append(weakref.ref(column))
+
+    def charge(self, nbytes):
+        with self._lock:
+            self.charged += nbytes
+            if self.charged > self.max_bytes:
+                self._release()
+
+    def release(self):
+        with self._lock:
+            self._release()
+
+    def _release(self):
+        for ref in self._columns:
+            column = ref()
+            # np.memmap keeps its mmap object in _mmap, the only handle madvise can be called on
+            if column is not None and hasattr(mmap, "MADV_DONTNEED"):
+                column._mmap.madvise(mmap.MADV_DONTNEED)
+        self.charged = 0
+        self.releases += 1
+
+
+def _touched_bytes(column, rows):
+    """Resident bytes that reading rows random rows of column can map."""
+    row_bytes = column.nbytes // len(column)
+    return min(rows * max(row_bytes, _FAULT_BYTES), column.nbytes)
+
+
+def _open_column(path, budget, mode="r+", dtype=None, shape=None):
+    """Memory-map the .npy file at path, registered with budget, as a plain ndarray."""
+    column = np.lib.format.open_memmap(path, mode=mode, dtype=dtype, shape=shape)
+    budget.register(column)
+    # the view skips np.memmap's Python-level __getitem__ on the scalar hot paths
+    return column.view(np.ndarray)
+
+
+def _copy_column(column, path):
+    """Copy a column from _open_column to path file to file, without reading it through the mapping."""
+    column.base.flush()
+    shutil.copyfile(column.base.filename, path)
+
+
+def _replace_file(source, path):
+    """Copy source over path; a mapping of the old file stays valid instead of being truncated."""
+    shutil.copyfile(source, path + ".tmp")
+    os.replace(path + ".tmp", path)
+
+
+class SumTree:
+    def __init__(self, capacity, directory=None, budget=None):
+        """
+        Binary sum-tree and min-tree over a fixed number of leaf priorities.
+
+        Both trees are stored as flat arrays of size 2 * leaves, where leaves is
+        capacity rounded up to a power of two, so every leaf sits at the same depth
+        and updates and prefix-sum lookups touch O(log N) nodes.
+
+        Args:
+            capacity: Number of priorities the tree has to hold.
+            directory: If given, the arrays are memory-mapped files sums.npy and
+                mins.npy in this directory instead of living in memory.
+            budget: ResidentBudget of the memory-mapped arrays.
+        """
+        self.capacity = capacity
+        self.leaves = 1
+        while self.leaves < capacity:
+            self.leaves *= 2
+        self.depth = self.leaves.bit_length() - 1
+        self.budget = budget if directory is not None else None
+        if directory is None:
+            self.sums = np.zeros(2 * self.leaves)
+            self.mins = np.full(2 * self.leaves, np.inf)
+            return
+        os.makedirs(directory, exist_ok=True)
+        self.sums = _open_column(os.path.join(directory, "sums.npy"), budget, "w+", np.float64, (2 * self.leaves,))
+        self.mins = _open_column(os.path.join(directory, "mins.npy"), budget, "w+", np.float64, (2 * self.leaves,))
+        for start in range(0, len(self.mins), _FILL_CHUNK):
+            self.mins[start:start + _FILL_CHUNK] = np.inf
+            budget.charge(self.mins[start:start + _FILL_CHUNK].nbytes)
+
+    @property
+    def total(self):
+        return self.sums[1]
+
+    @property
+    def min(self):
+        return self.mins[1]
+
+    def get(self, indices):
+        return self.sums[np.asarray(indices) + self.leaves]
+
+    def _charge(self, level, nodes, arrays):
+        """Charge the budget of memory-mapped arrays for reading nodes random nodes of a level."""
+        if self.budget is not None:
+            self.budget.charge(arrays * min(nodes * _FAULT_BYTES, self.sums.itemsize << level))
+
+    def update(self, indices, priorities):
+        """
+        Set leaf priorities and recompute their ancestors, one tree level at a time.
+
+        Args:
+            indices: Leaf indices to update.
+            priorities: New priorities for the corresponding leaves.
+        """
+        nodes = np.asarray(indices, dtype=np.int64) + self.leaves
+        self.sums[nodes] = priorities
+        self.mins[nodes] = priorities
+        for level in range(self.depth, 0, -1):
+            self._charge(level, len(nodes), 2)
+            nodes = np.unique(nodes >> 1)
+            left = 2 * nodes
+            self.sums[nodes] = self.sums[left] + self.sums[left + 1]
+            self.mins[nodes] = np.minimum(self.mins[left], self.mins[left + 1])
+
+    def update_one(self, index, priority):
+        """Scalar version of update for single inserts, avoiding the per-level np.unique."""
+        node = index + self.leaves
+        sums, mins = self.sums, self.mins
+        sums[node] = priority
+        mins[node] = priority
+        if self.budget is not None:
+            # inserts walk the leaves in order, so a path mostly reuses the pages of the previous one
+            self.budget.charge(4 * sums.itemsize)
+        while node > 1:
+            node >>= 1
+            left = 2 * node
+            sums[node] = sums[left] + sums[left + 1]
+            mins[node] = min(mins[left], mins[left + 1])
+
+    def find(self, values):
+        """
+        Find the leaves whose cumulative priority range contains each value.
+
+        Args:
+            values: Prefix sums in [0, total).
+
+        Returns:
+            Array of leaf indices, one per value.
+        """
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        for level in range(1, self.depth + 1):
+            self._charge(level, len(values), 1)
+            left = 2 * nodes
+            left_sums = self.sums[left]
+            go_right = values > left_sums
+            values = np.where(go_right, values - left_sums, values)
+            nodes = np.where(go_right, left + 1, left)
+        return nodes - self.leaves
+
+
+class ArrayReplayBuffer:
+    def __init__(self, capacity, state_shape, state_dtype=np.float32, store_next_state=True):
+        """
+        A uniform replay memory backed by preallocated column arrays.
+
+        Transitions are written into a ring of contiguous arrays, so sampling a batch is a
+        single fancy-indexing gather per column instead of random.sample over a deque of
+        tuples followed by zip(*batch).
+
+        With store_next_state=False the next state of a transition is read from the state
+        column of the following slot. Only transitions whose successor is not stored there
+        (episode boundaries and the newest transition) keep their own next state.
+
+        Args:
+            capacity: Maximum number of transitions.
+            state_shape: Shape of a single state.
+            state_dtype: Dtype of the state columns.
+            store_next_state: Whether to keep a separate next_state column.
+        """
+        self.capacity = capacity
+        self.store_next_state = store_next_state
+        self.states = np.zeros((capacity, *state_shape), dtype=state_dtype)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.dones = np.zeros(capacity, dtype=np.float32)
+        if store_next_state:
+            self.next_states = np.zeros((capacity, *state_shape), dtype=state_dtype)
+        else:
+            self.boundary = np.zeros(capacity, dtype=bool)
+            self.boundary_next_states = {}
+            self.pending_next_state = None
+        self.position = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def nbytes(self):
+        """Bytes used per stored transition, excluding the sparse boundary states."""
+        columns = [self.states, self.actions, self.rewards, self.dones]
+        columns.append(self.next_states if self.store_next_state else self.boundary)
+        return sum(column.nbytes for column in columns) // self.capacity
+
+    def append(self, state, action, reward, next_state, done):
+        """
+        Add a transition, overwriting the oldest one once the buffer is full.
+
+        Args:
+            state: State the action was taken in.
+            action: Action index.
+            reward: Reward received.
+            next_state: State reached after the action.
+            done: Whether next_state is terminal.
+        """
+        i = self.position
+        if not self.store_next_state:
+            newest = (i - 1) % self.capacity
+            if self.size and not np.array_equal(state, self.pending_next_state):
+                self.boundary[newest] = True
+                self.boundary_next_states[newest] = self.pending_next_state
+            if self.boundary[i]:
+                self.boundary[i] = False
+                del self.boundary_next_states[i]
+            self.pending_next_state = np.array(next_state, dtype=self.states.dtype)
+        else:
+            self.next_states[i] = next_state
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        """
+        Add a batch of transitions, e.g. one step of a vector env.
+
+        Args:
+            states, actions, rewards, next_states, dones: Arrays with one row per transition.
+        """
+        if not self.store_next_state:
+            for transition in zip(states, actions, rewards, next_states, dones):
+                self.append(*transition)
+            return
+        slots = (self.position + np.arange(len(actions))) % self.capacity
+        self.states[slots] = states
+        self.actions[slots] = actions
+        self.rewards[slots] = rewards
+        self.next_states[slots] = next_states
+        self.dones[slots] = dones
+        self.position = (self.position + len(actions)) % self.capacity
+        self.size = min(self.size + len(actions), self.capacity)
+
+    def gather(self, indices):
+        """
+        Assemble the columns of the given transitions.
+
+        Args:
+            indices: Slot indices to read.
+
+        Returns:
+            A tuple of (states, actions, rewards, next_states, dones) arrays.
+        """
+        if self.store_next_state:
+            next_states = self.next_states[indices]
+        else:
+            next_states = self.states[(indices + 1) % self.capacity]
+            newest = (self.position - 1) % self.capacity
+            for row in np.flatnonzero(self.boundary[indices] | (indices == newest)):
+                i = indices[row]
+                next_states[row] = self.pending_next_state if i == newest else self.boundary_next_states[i]
+        return self.states[indices], self.actions[indices], self.rewards[indices], next_states, self.dones[indices]
+
+    def sample(self, batch_size):
+        """
+        Sample a batch of transitions uniformly, with replacement.
+
+        Args:
+            batch_size: Number of transitions to sample.
+
+        Returns:
+            A tuple of (states, actions, rewards, next_states, dones) arrays.
+        """
+        return self.gather(np.random.randint(0, self.size, batch_size))
+
+    def _columns(self):
+        names = ["states", "actions", "rewards", "dones", "next_states" if self.store_next_state else "boundary"]
+        return {name: getattr(self, name) for name in names}
+
+    def save(self, directory):
+        """
+        Write the buffer as raw .npy columns plus meta.json, so load can memory-map it.
+
+        Args:
+            directory: Target directory, created if missing.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name, column in self._columns().items():
+            np.save(os.path.join(directory, f"{name}.npy"), column)
+        meta = {"capacity": self.capacity, "store_next_state": self.store_next_state,
+                "position": self.position, "size": self.size}
+        if not self.store_next_state:
+            slots = np.array(sorted(self.boundary_next_states), dtype=np.int64)
+            next_states = np.zeros((len(slots), *self.states.shape[1:]), dtype=self.states.dtype)
+            for row, i in enumerate(slots):
+                next_states[row] = self.boundary_next_states[i]
+            np.save(os.path.join(directory, "boundary_slots.npy"), slots)
+            np.save(os.path.join(directory, "boundary_next_states.npy"), next_states)
+            if self.pending_next_state is not None:
+                np.save(os.path.join(directory, "pending_next_state.npy"), self.pending_next_state)
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="c"):
+        """
+        Reopen a buffer written by save without reading the columns into memory.
+
+        Args:
+            directory: Directory written by save.
+            mmap_mode: np.load mmap mode. The default "c" maps the files copy-on-write,
+                so the resumed buffer can be appended to without touching the saved copy.
+        """
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        buffer = cls.__new__(cls)
+        buffer.capacity = meta["capacity"]
+        buffer.store_next_state = meta["store_next_state"]
+        buffer.position = meta["position"]
+        buffer.size = meta["size"]
+        names = ["states", "actions", "rewards", "dones", "next_states" if buffer.store_next_state else "boundary"]
+        for name in names:
+            setattr(buffer, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+        if not buffer.store_next_state:
+            slots = np.load(os.path.join(directory, "boundary_slots.npy"))
+            next_states = np.load(os.path.join(directory, "boundary_next_states.npy"))
+            buffer.boundary_next_states = dict(zip(slots.tolist(), next_states))
+            pending_path = os.path.join(directory, "pending_next_state.npy")
+            buffer.pending_next_state = np.load(pending_path) if os.path.exists(pending_path) else None
+        return buffer
+
+
+class MemmapReplayBuffer(ArrayReplayBuffer):
+    def __init__(self, capacity, state_shape, directory, state_dtype=np.float32, budget=None, prefetch=True,
+                 read_chunk=256):
+        """
+        An ArrayReplayBuffer whose columns are memory-mapped .npy files on local disk.
+
+        Capacity is bounded by disk space instead of memory: the resident set is kept
+        within budget, however large the files get. A batch is read in file order, in
+        chunks of read_chunk sorted rows charged to the budget one at a time, so a large
+        batch cannot map more than a chunk past the budget. With
+        prefetch, sample draws the indices of the next batch as soon as it returns and a
+        background thread gathers it while the caller trains on the current one; the
+        prefetched batch can miss the transitions appended meanwhile.
+
+        The column files are valid .npy files, so save copies them file to file and
+        ArrayReplayBuffer.load can open the result. restore copies a saved buffer back
+        into this buffer's own files.
+
+        Args:
+            capacity: Maximum number of transitions.
+            state_shape: Shape of a single state.
+            directory: Directory for the column files, created if missing. Existing
+                column files are overwritten.
+            state_dtype: Dtype of the state columns.
+            budget: ResidentBudget shared with the process's other mapped buffers,
+                default a private one.
+            prefetch: Whether sample gathers the next batch in the background.
+            read_chunk: Rows read per chunk of a batch.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.budget = budget if budget is not None else ResidentBudget()
+        self.prefetch = prefetch
+        self.read_chunk = read_chunk
+        self.capacity = capacity
+        self.store_next_state = True
+        columns = {"states": ((capacity, *state_shape), state_dtype), "actions": ((capacity,), np.int64),
+                   "rewards": ((capacity,), np.float32), "dones": ((capacity,), np.float32),
+                   "next_states": ((capacity, *state_shape), state_dtype)}
+        for name, (shape, dtype) in columns.items():
+            setattr(self, name, _open_column(os.path.join(directory, f"{name}.npy"), self.budget, "w+", dtype, shape))
+        self.position = 0
+        self.size = 0
+        self._row_bytes = self.nbytes
+        self._lock = threading.Lock()
+        self._executor = None
+        self._next_batch = None
+
+    def append(self, state, action, reward, next_state, done):
+        with self._lock:
+            super().append(state, action, reward, next_state, done)
+        self.budget.charge(self._row_bytes)
+
+    def extend(self, states, actions, rewards, next_states, dones):
+        with self._lock:
+            super().extend(states, actions, rewards, next_states, dones)
+        self.budget.charge(self._row_bytes * len(actions))
+
+    def gather(self, indices):
+        indices = np.asarray(indices)
+        order = np.argsort(indices, kind="stable")
+        rows = indices[order]
+        columns = (self.states, self.actions, self.rewards, self.next_states, self.dones)
+        batch = tuple(np.empty((len(rows), *column.shape[1:]), dtype=column.dtype) for column in columns)
+        for start in range(0, len(rows), self.read_chunk):
+            chunk = slice(start, start + self.read_chunk)
+            with self._lock:
+                for out, column in zip(batch, columns):
+                    out[order[chunk]] = column[rows[chunk]]
+            self.budget.charge(sum(_touched_bytes(column, len(rows[chunk])) for column in columns))
+        return batch
+
+    def sample(self, batch_size):
+        if not self.prefetch:
+            return super().sample(batch_size)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(1, thread_name_prefix="replay-prefetch")
+        batch = self._take_prefetched(batch_size)
+        if batch is None:
+            batch = super().sample(batch_size)
+        indices = np.random.randint(0, self.size, batch_size)
+        self._next_batch = batch_size, self._executor.submit(self.gather, indices)
+        return batch
+
+    def _take_prefetched(self, batch_size=None):
+        """The prefetched batch if it has batch_size rows, else None; either way it is consumed."""
+        if self._next_batch is None:
+            return None
+        size, future = self._next_batch
+        self._next_batch = None
+        batch = future.result()
+        return batch if size == batch_size else None
+
+    def save(self, directory):
+        """Copy the column files and write meta.json; see ArrayReplayBuffer.save."""
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            for name, column in self._columns().items():
+                _copy_column(column, os.path.join(directory, f"{name}.npy"))
+            meta = {"capacity": self.capacity, "store_next_state": True, "position": self.position,
+                    "size": self.size}
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    def restore(self, directory):
+        """Replace the contents with a buffer of the same capacity written by save."""
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        if meta["capacity"] != self.capacity or not meta["store_next_state"]:
+            raise ValueError(f"cannot restore {directory} into a buffer of capacity {self.capacity}")
+        self._take_prefetched()
+        with self._lock:
+            for name in self._columns():
+                path = os.path.join(self.directory, f"{name}.npy")
+                _replace_file(os.path.join(directory, f"{name}.npy"), path)
+                setattr(self, name, _open_column(path, self.budget))
+            self.position = meta["position"]
+            self.size = meta["size"]
+
+    @classmethod
+    def load(cls, directory, mmap_mode="c"):
+        """Open a saved buffer as an ArrayReplayBuffer; use restore to resume into memory-mapped files."""
+        return ArrayReplayBuffer.load(directory, mmap_mode)
+
+
+class NStepAccumulator:
+    def __init__(self, n, discount_factor):
+        """
+        Turns the 1-step transitions of one env into n-step transitions as they arrive.
+
+        A transition leaves after n more steps, as (state, action, discounted sum of the n
+        rewards, state n steps later, done), or earlier when its episode terminates or
+        is truncated. So that the agents' 1-step target
+
+            reward + (1 - done) * discount_factor * max_a Q(next_state, a)
+
+        bootstraps with discount_factor ** k after k steps, the done column holds
+        1 - discount_factor ** (k - 1) for transitions that bootstrap (k = n, or a tail
+        cut short by truncation) and 1 for terminal ones. With n = 1 that is the plain
+        0/1 done flag, and 1-step transitions stored elsewhere in the same buffer stay
+        valid.
+
+        Args:
+            n: Steps summed per transition.
+            discount_factor: The agent's discount factor.
+        """
+        self.n = n
+        self.discount_factor = discount_factor
+        self.pending = collections.deque()
+
+    def _transition(self, entry, next_state, done):
+        state, action, reward, steps = entry
+        bootstrap = 0.0 if done else self.discount_factor ** (steps - 1)
+        return state, action, reward, next_state, 1.0 - bootstrap
+
+    def push(self, state, action, reward, next_state, done, truncated=False):
+        """
+        Add one env step.
+
+        Args:
+            state, action, reward, next_state, done: The 1-step transition.
+            truncated: Whether the episode was cut off without terminating.
+
+        Returns:
+            List of finished n-step transitions, oldest first, each a tuple for
+            ArrayReplayBuffer.append.
+        """
+        for entry in self.pending:
+            entry[2] += self.discount_factor ** entry[3] * reward
+            entry[3] += 1
+        self.pending.append([state, action, reward, 1])
+        if done or truncated:
+            finished = [self._transition(entry, next_state, done) for entry in self.pending]
+            self.pending.clear()
+            return finished
+        if len(self.pending) == self.n:
+            return [self._transition(self.pending.popleft(), next_state, False)]
+        return []
+
+    def tail(self, next_state):
+        """The pending transitions cut short at next_state, as a truncation there would emit them; pending is kept."""
+        return [self._transition(entry, next_state, False) for entry in self.pending]
+
+    def clear(self):
+        self.pending.clear()
+
+
+class SumTreeReplayBuffer:
+    def __init__(self, max_size, alpha=0.2, beta_start=0.4, beta_increment=0.001, directory=None, budget=None):
+        """
+        A prioritized replay buffer backed by a sum-tree, with the same interface as
+        prioritized_replay_buffer except that sample returns column arrays.
+
+        Experiences are written to the ring of an ArrayReplayBuffer, so adding is
+        O(log N) instead of an O(N) list.pop(0) and a sampled batch is one gather per
+        column. Sampling is stratified over the total priority mass and importance
+        weights are normalized by the global minimum priority kept in the min-tree.
+
+        With directory, the tree arrays and the experiences (a MemmapReplayBuffer, without
+        prefetch since the next batch depends on the priorities updated after this one)
+        are memory-mapped files under directory, sharing budget.
+
+        Args:
+            max_size: Maximum size of the buffer.
+            alpha: How much prioritization is used (0 = uniform sampling, 1 = fully prioritized).
+            beta_start: Starting value of beta for importance sampling weights.
+            beta_increment: Increment for beta per step to approach unbiased sampling.
+            directory: Directory for memory-mapped storage, or None to keep everything in memory.
+            budget: ResidentBudget of the memory-mapped storage, default a private one.
+        """
+        self.directory = directory
+        self.budget = None
+        tree_directory = None
+        if directory is not None:
+            self.budget = budget if budget is not None else ResidentBudget()
+            tree_directory = os.path.join(directory, "tree")
+        self.tree = SumTree(max_size, tree_directory, self.budget)
+        self.storage = None  # allocated on the first add, once the state shape is known
+        self.max_size = max_size
+        self.alpha = alpha
+        self.beta = beta_start
+        self.beta_increment = beta_increment
+        self.position = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, experience, error):
+        """
+        Add an experience to the buffer with an associated error, overwriting the oldest
+        one once the buffer is full.
+
+        Args:
+            experience: The experience to store (state, action, reward, next_state, done).
+            error: TD error associated with the experience.
+        """
+        priority = (abs(error) + 1e-6) ** self.alpha
+        if self.storage is None:
+            self.storage = self._new_storage(np.shape(experience[0]))
+        self.storage.append(*experience)
+        self.tree.update_one(self.position, priority)
+        self.position = (self.position + 1) % self.max_size
+        self.size = min(self.size + 1, self.max_size)
+
+    def sample(self, batch_size):
+        """
+        Sample a batch of experiences using prioritized probabilities.
+
+        Args:
+            batch_size: Number of experiences to sample.
+
+        Returns:
+            A tuple of ((states, actions, rewards, next_states, dones) arrays, indices,
+            importance sampling weights).
+        """
+        total = self.tree.total
+        segment = total / batch_size
+        values = (np.arange(batch_size) + np.random.random(batch_size)) * segment
+        indices = np.minimum(self.tree.find(values), self.size - 1)
+        samples = self.storage.gather(indices)
+
+        # Compute importance sampling weights
+        probabilities = self.tree.get(indices) / total
+        weights = (self.size * probabilities) ** (-self.beta)
+        weights /= (self.size * self.tree.min / total) ** (-self.beta)  # Normalize by the largest possible weight
+        self.beta = min(1.0, self.beta + self.beta_increment)  # Increase beta over time
+
+        return samples, indices, weights
+
+    def update_priority(self, indices, errors):
+        """
+        Update priorities of sampled experiences.
+
+        Args:
+            indices: Indices of the sampled experiences.
+            errors: TD errors for the corresponding indices.
+        """
+        self.tree.update(indices, (np.abs(errors) + 1e-6) ** self.alpha)
+
+    def _new_storage(self, state_shape):
+        if self.directory is None:
+            return ArrayReplayBuffer(self.max_size, state_shape)
+        return MemmapReplayBuffer(self.max_size, state_shape, os.path.join(self.directory, "storage"),
+                                  budget=self.budget, prefetch=False)
+
+    def save(self, directory):
+        """Write the priorities and experiences as raw arrays; see ArrayReplayBuffer.save."""
+        os.makedirs(directory, exist_ok=True)
+        if self.directory is None:
+            np.save(os.path.join(directory, "sums.npy"), self.tree.sums)
+            np.save(os.path.join(directory, "mins.npy"), self.tree.mins)
+        else:
+            _copy_column(self.tree.sums, os.path.join(directory, "sums.npy"))
+            _copy_column(self.tree.mins, os.path.join(directory, "mins.npy"))
+        if self.storage is not None:
+            self.storage.save(os.path.join(directory, "storage"))
+        meta = {"max_size": self.max_size, "alpha": self.alpha, "beta": self.beta,
+                "beta_increment": self.beta_increment, "position": self.position, "size": self.size}
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+    @classmethod
+    def load(cls, directory, mmap_mode="c"):
+        """Reopen a buffer written by save, memory-mapping its arrays; see ArrayReplayBuffer.load."""
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        buffer = cls(meta["max_size"], meta["alpha"], meta["beta"], meta["beta_increment"])
+        buffer.position = meta["position"]
+        buffer.size = meta["size"]
+        buffer.tree.sums = np.load(os.path.join(directory, "sums.npy"), mmap_mode=mmap_mode)
+        buffer.tree.mins = np.load(os.path.join(directory, "mins.npy"), mmap_mode=mmap_mode)
+        if os.path.exists(os.path.join(directory, "storage")):
+            buffer.storage = ArrayReplayBuffer.load(os.path.join(directory, "storage"), mmap_mode)
+        return buffer
+
+    def restore(self, directory):
+        """Copy a buffer of the same max_size written by save into this buffer's memory-mapped files."""
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        if self.directory is None or meta["max_size"] != self.max_size:
+            raise ValueError(f"cannot restore {directory} into this buffer, use SumTreeReplayBuffer.load")
+        for name in ("sums", "mins"):
+            path = os.path.join(self.directory, "tree", f"{name}.npy")
+            _replace_file(os.path.join(directory, f"{name}.npy"), path)
+            setattr(self.tree, name, _open_column(path, self.budget))
+        storage = os.path.join(directory, "storage")
+        if os.path.exists(storage):
+            if self.storage is None:
+                self.storage = self._new_storage(np.load(os.path.join(storage, "states.npy"), mmap_mode="r").shape[1:])
+            self.storage.restore(storage)
+        self.beta = meta["beta"]
+        self.position = meta["position"]
+        self.size = meta["size"]
+
+
+class prioritized_replay_buffer:
+    def __init__(self, max_size, alpha=0.2, beta_start=0.4, beta_increment=0.001):
+        """
+        A prioritized replay buffer for experience sampling with importance sampling.
+
+        This is the original list-based implementation, kept as the reference for
+        benchmarks/replay_throughput.py. Use SumTreeReplayBuffer for training.
+
+        Args:
+            max_size: Maximum size of the buffer.
+            alpha: How much prioritization is used (0 = uniform sampling, 1 = fully prioritized).
+            beta_start: Starting value of beta for importance sampling weights.
+            beta_increment: Increment for beta per step to approach unbiased sampling.
+        """
+        self.exp_buffer = []
+        self.error_buffer = []
+        self.max_size = max_size
+        self.alpha = alpha
+        self.beta = beta_start
+        self.beta_increment = beta_increment
+
+    def __len__(self):
+        return len(self.exp_buffer)
+
+    def add(self, experience, error):
+        """
+        Add an experience to the buffer with an associated error.
+
+        Args:
+            experience: The experience to store (state, action, reward, next_state, done).
+            error: TD error associated with the experience.
+        """
+        priority = (abs(error) + 1e-6) ** self.alpha
+        if len(self.exp_buffer) >= self.max_size:
+            self.exp_buffer.pop(0)
+            self.error_buffer.pop(0)
+        self.exp_buffer.append(experience)
+        self.error_buffer.append(priority)
+
+    def sample(self, batch_size):
+        """
+        Sample a batch of experiences using prioritized probabilities.
+
+        Args:
+            batch_size: Number of experiences to sample.
+
+        Returns:
+            A tuple of (sampled experiences, indices, importance sampling weights).
+        """
+        priorities = np.array(self.error_buffer)
+        probabilities = priorities / sum(priorities)
+        indices = np.random.choice(len(self.exp_buffer), batch_size, p=probabilities)
+        samples = [self.exp_buffer[i] for i in indices]
+
+        # Compute importance sampling weights
+        total = len(self.exp_buffer)
+        weights = (total * probabilities[indices]) ** (-self.beta)
+        weights /= weights.max()  # Normalize weights
+        self.beta = min(1.0, self.beta + self.beta_increment)  # Increase beta over time
+
+        return samples, indices, weights
+
+    def update_priority(self, indices, errors):
+        """
+        Update priorities of sampled experiences.
+
+        Args:
+            indices: Indices of the sampled experiences.
+            errors: TD errors for the corresponding indices.
+        """
+        for idx, error in zip(indices, errors):
+            self.error_buffer[idx] = (abs(error) + 1e-6) ** self.alpha
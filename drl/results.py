@@ -0,0 +1,175 @@
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    key TEXT PRIMARY KEY,
+    sweep TEXT NOT NULL,
+    model TEXT,
+    config TEXT NOT NULL,
+    seed INTEGER,
+    settings TEXT NOT NULL,
+    code_version TEXT NOT NULL,
+    metrics TEXT NOT NULL,
+    rewards BLOB,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_sweep ON runs (sweep, model);
+"""
+
+
+def code_version(package_dir=os.path.dirname(os.path.abspath(__file__))):
+    """Hash of the contents of the package's Python sources, without relying on git."""
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(package_dir, "**", "*.py"), recursive=True)):
+        digest.update(os.path.relpath(path, package_dir).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def run_key(config, seed, settings, version):
+    """Content hash identifying a run: its config, seed, training settings and code version."""
+    payload = json.dumps({"config": config, "seed": seed, "settings": settings, "code_version": version},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class RunStore:
+    def __init__(self, path="results.db", version=None):
+        """
+        Local SQLite store of finished sweep runs, so repeated sweeps only train the missing configs.
+
+        A run is keyed by run_key: the hash of its config, seed, the training settings
+        shared by the sweep (episodes, schedule, n-step, ...) and the code version,
+        by default the hash of the drl sources. Changing any of them makes the run
+        miss and train again; old rows stay queryable. Each row holds the result's
+        scalar metrics (first_time_passed, avg_reward, test_reward, ...) as JSON and
+        the per-episode reward curve as a float32 blob.
+
+        Args:
+            path: SQLite database file, created if missing.
+            version: Code version to key runs by, default code_version().
+        """
+        self.path = path
+        self.version = version if version is not None else code_version()
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(_SCHEMA)
+
+    def key(self, config, seed, settings):
+        return run_key(config, seed, settings, self.version)
+
+    def get(self, config, seed, settings):
+        """
+        The stored result of a run of the current code version, or None.
+
+        Returns:
+            The metrics dict passed to put, with the reward curve as a "rewards" list if
+            one was stored.
+        """
+        row = self.connection.execute("SELECT metrics, rewards FROM runs WHERE key = ?",
+                                      (self.key(config, seed, settings),)).fetchone()
+        if row is None:
+            return None
+        result = json.loads(row["metrics"])
+        if row["rewards"] is not None:
+            result["rewards"] = np.frombuffer(row["rewards"], dtype=np.float32).tolist()
+        return result
+
+    def put(self, sweep, config, seed, settings, result):
+        """
+        Store the result of a finished run, replacing an earlier one with the same key.
+
+        Args:
+            sweep: Name of the sweep the run belongs to, e.g. "dqn" or "qlearning".
+            config: Config dict; its "model" entry, if any, is the model of best_per_model.
+            seed: Seed the run was trained with.
+            settings: JSON-serializable training settings shared by the sweep.
+            result: Dict of JSON-serializable metrics; a "rewards" list is stored as the
+                reward curve and "losses" is dropped.
+        """
+        metrics = {name: value for name, value in result.items() if name not in ("rewards", "losses")}
+        rewards = result.get("rewards")
+        self.connection.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (self.key(config, seed, settings), sweep, config.get("model"), json.dumps(config, sort_keys=True),
+             seed, json.dumps(settings, sort_keys=True, default=str), self.version, json.dumps(metrics),
+             np.asarray(rewards, dtype=np.float32).tobytes() if rewards is not None else None, time.time()))
+        self.connection.commit()
+
+    def split(self, configs, seeds, settings):
+        """
+        Partition configs into stored and missing runs.
+
+        Args:
+            configs: Config dicts.
+            seeds: Seed of each config.
+            settings: Training settings shared by the configs.
+
+        Returns:
+            A tuple of ([(config, result), ...] for the stored runs, [config, ...] for
+            the missing ones), both in the order of configs.
+        """
+        stored, missing = [], []
+        for config, seed in zip(configs, seeds):
+            result = self.get(config, seed, settings)
+            if result is None:
+                missing.append(config)
+            else:
+                stored.append((config, result))
+        return stored, missing
+
+    def _ranked(self, sweep, metric, ascending, code_version):
+        order = "ASC" if ascending else "DESC"
+        where = "sweep = ? AND json_extract(metrics, ?) IS NOT NULL"
+        parameters = [f"$.{metric}", sweep, f"$.{metric}"]
+        if code_version is not None:
+            where += " AND code_version = ?"
+            parameters.append(code_version)
+        return (f"SELECT *, ROW_NUMBER() OVER (PARTITION BY model ORDER BY json_extract(metrics, ?) {order}) AS rank "
+                f"FROM runs WHERE {where}"), parameters, order
+
+    @staticmethod
+    def _row(row):
+        return {"key": row["key"], "model": row["model"], "config": json.loads(row["config"]), "seed": row["seed"],
+                "code_version": row["code_version"], **json.loads(row["metrics"])}
+
+    def top_k(self, sweep, k=10, metric="avg_reward", ascending=False, code_version=None):
+        """
+        The k best runs of a sweep by a metric.
+
+        Args:
+            sweep: Sweep name as passed to put.
+            k: Number of runs.
+            metric: Key of the stored metrics to rank by.
+            ascending: Rank the lowest values first, e.g. for Q-learning's avg_steps.
+            code_version: Only runs of this code version; by default all versions.
+
+        Returns:
+            List of dicts with key, model, config, seed, code_version and the metrics.
+        """
+        query, parameters, order = self._ranked(sweep, metric, ascending, code_version)
+        rows = self.connection.execute(f"SELECT * FROM ({query}) ORDER BY json_extract(metrics, ?) {order} LIMIT ?",
+                                       [*parameters, f"$.{metric}", k])
+        return [self._row(row) for row in rows]
+
+    def best_per_model(self, sweep, metric="avg_reward", ascending=False, code_version=None):
+        """The best run of each model of a sweep, as top_k rows ordered by model."""
+        query, parameters, _ = self._ranked(sweep, metric, ascending, code_version)
+        rows = self.connection.execute(f"SELECT * FROM ({query}) WHERE rank = 1 ORDER BY model", parameters)
+        return [self._row(row) for row in rows]
+
+    def rewards(self, key):
+        """Reward curve of the run with this key, or None."""
+        row = self.connection.execute("SELECT rewards FROM runs WHERE key = ?", (key,)).fetchone()
+        return np.frombuffer(row["rewards"], dtype=np.float32) if row and row["rewards"] is not None else None
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,50 @@
+class UpdateSchedule:
+    def __init__(self, train_every=1, gradient_steps=1, warmup=0, target_update_steps=None):
+        """
+        When the training loops take gradient steps and sync the target network.
+
+        The defaults reproduce the original loops: one gradient step per env step once
+        the buffer holds a batch, and target syncs every target_update_every episodes.
+        The replay ratio (gradient samples per env step) is
+        gradient_steps * batch_size / train_every.
+
+        Args:
+            train_every: Env steps between updates.
+            gradient_steps: Gradient steps per update.
+            warmup: Env steps collected before the first update. Updates also wait until
+                the buffer holds at least one batch.
+            target_update_steps: If set, sync the target network every this many gradient
+                steps instead of every target_update_every episodes.
+        """
+        self.train_every = train_every
+        self.gradient_steps = gradient_steps
+        self.warmup = warmup
+        self.target_update_steps = target_update_steps
+
+    def updates_due(self, env_steps, buffer_size, batch_size, new_steps=1):
+        """
+        Gradient steps to take now.
+
+        Args:
+            env_steps: Env steps collected so far, including the new ones.
+            buffer_size: Experiences in the replay buffer.
+            batch_size: Training batch size.
+            new_steps: Env steps collected since the last call, e.g. one per live env
+                of a vector env.
+        """
+        if env_steps < self.warmup or buffer_size < batch_size:
+            return 0
+        ticks = env_steps // self.train_every - (env_steps - new_steps) // self.train_every
+        return ticks * self.gradient_steps
+
+    def sync_due(self, gradient_step):
+        """Whether to sync the target network after gradient step number gradient_step."""
+        return self.target_update_steps is not None and gradient_step % self.target_update_steps == 0
+
+    def sync_episode_due(self, episode, target_update_every):
+        """Whether to sync the target network at the end of an episode."""
+        return self.target_update_steps is None and episode % target_update_every == 0
+
+    def __repr__(self):
+        return (f"UpdateSchedule(train_every={self.train_every}, gradient_steps={self.gradient_steps}, "
+                f"warmup={self.warmup}, target_update_steps={self.target_update_steps})")
@@ -0,0 +1,260 @@
+import collections
+import http.client
+import json
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from drl.inference import NumpyPolicy
+
+
+def load_model(path, model_name=None):
+    """
+    Load a trained DQN3Layers/DQN5Layers on the CPU.
+
+    Args:
+        path: torch.save'd state dict of the model, an agent.pt written by
+            drl.checkpoint.Checkpointer, a checkpoint directory holding one, or a
+            Checkpointer directory, whose latest checkpoint is used.
+        model_name: Key of drl.models.MODELS; by default the model whose parameters
+            match the state dict.
+
+    Returns:
+        A tuple of (model, model_name).
+    """
+    import torch
+
+    from drl.checkpoint import Checkpointer
+    from drl.models import MODELS
+
+    if os.path.isdir(path):
+        if not os.path.exists(os.path.join(path, "agent.pt")):
+            path = Checkpointer(path).latest() or path
+        path = os.path.join(path, "agent.pt")
+    state = torch.load(path, map_location="cpu", weights_only=False)
+    state = state.get("model", state)
+    weights = [value for name, value in state.items() if name.endswith("weight")]
+    state_size, action_size = weights[0].shape[1], weights[-1].shape[0]
+    for name in [model_name] if model_name is not None else MODELS:
+        model = MODELS[name](state_size, action_size)
+        expected = model.state_dict()
+        if expected.keys() == state.keys() and all(expected[key].shape == state[key].shape for key in state):
+            model.load_state_dict(state)
+            model.eval()
+            return model, name
+    raise ValueError(f"{path} holds none of the models {[model_name] if model_name else list(MODELS)}")
+
+
+class _Request:
+    def __init__(self, states):
+        self.states = states
+        self.arrival = time.perf_counter()
+        self.done = threading.Event()
+        self.actions = None
+
+
+class MicroBatcher:
+    def __init__(self, policy, max_batch_size=256, max_delay=0.002, window=10000):
+        """
+        Runs the greedy actions of concurrent callers as batched forward passes on one thread.
+
+        A batch opens with the oldest waiting request and takes every request that
+        arrives within max_delay of it, or until max_batch_size states are collected;
+        requests already queued when the deadline passes join as well. So a lone request
+        waits at most max_delay before its forward pass, and under load the batch
+        size grows until a pass keeps up with the arrival rate.
+
+        Latency (queueing plus forward pass) and throughput are tracked over the last
+        window requests, see stats.
+
+        Args:
+            policy: NumpyPolicy of the served model.
+            max_batch_size: States per forward pass.
+            max_delay: Seconds the first request of a batch waits for others.
+            window: Requests the latency percentiles and throughput are computed over.
+        """
+        self.policy = policy
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self.requests = queue.SimpleQueue()
+        self.latencies = collections.deque(maxlen=window)
+        self.finished = collections.deque(maxlen=window)
+        self.counters = {"requests": 0, "states": 0, "batches": 0}
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def act(self, states):
+        """
+        Greedy actions for states, blocking until their batch has run.
+
+        Args:
+            states: Array-like of shape [n, features].
+
+        Returns:
+            Array of n actions.
+        """
+        states = np.asarray(states, dtype=np.float32)
+        if states.ndim != 2 or states.shape[1] != self.policy.layer_sizes[0]:
+            raise ValueError(f"expected states of shape [n, {self.policy.layer_sizes[0]}], got {states.shape}")
+        request = _Request(states)
+        self.requests.put(request)
+        request.done.wait()
+        return request.actions
+
+    def _run(self):
+        while True:
+            first = self.requests.get()
+            if first is None:
+                return
+            batch = [first]
+            size = len(first.states)
+            deadline = first.arrival + self.max_delay
+            while size < self.max_batch_size:
+                try:
+                    request = self.requests.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if request is None:
+                    self.requests.put(None)  # finish this batch, stop on the next get
+                    break
+                batch.append(request)
+                size += len(request.states)
+
+            actions = self.policy.act_batch(np.concatenate([request.states for request in batch]))
+            now = time.perf_counter()
+            offset = 0
+            for request in batch:
+                request.actions = actions[offset:offset + len(request.states)]
+                offset += len(request.states)
+                request.done.set()
+            with self._lock:
+                self.latencies.extend(now - request.arrival for request in batch)
+                self.finished.extend([now] * len(batch))
+                self.counters["requests"] += len(batch)
+                self.counters["states"] += size
+                self.counters["batches"] += 1
+
+    def stats(self):
+        """
+        Counters since start plus p50/p99 latency and throughput over the latency window.
+
+        Returns:
+            Dict with requests, states, batches, mean_batch_size, p50_ms, p99_ms,
+            requests_per_sec (over the window) and uptime_s.
+        """
+        with self._lock:
+            latencies = np.array(self.latencies)
+            span = self.finished[-1] - self.finished[0] if len(self.finished) > 1 else 0.0
+            stats = dict(self.counters)
+        stats["mean_batch_size"] = stats["states"] / stats["batches"] if stats["batches"] else 0.0
+        p50, p99 = 1e3 * np.percentile(latencies, [50, 99]) if len(latencies) else (0.0, 0.0)
+        stats["p50_ms"], stats["p99_ms"] = float(p50), float(p99)
+        stats["requests_per_sec"] = (len(latencies) - 1) / span if span > 0 else 0.0
+        stats["uptime_s"] = time.perf_counter() - self.started
+        return stats
+
+    def close(self):
+        self.requests.put(None)
+        self._thread.join()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so a client reuses its connection
+    # headers and body go out in separate writes, which Nagle's algorithm would hold back for the client's ACK
+    disable_nagle_algorithm = True
+
+    def _reply(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._reply(200, {"model": self.server.model_name, **self.server.batcher.stats()})
+        elif self.path == "/healthz":
+            self._reply(200, {"status": "ok"})
+        else:
+            self._reply(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/act":
+            self._reply(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            single = "state" in body
+            actions = self.server.batcher.act([body["state"]] if single else body["states"])
+        except (ValueError, KeyError, TypeError) as error:
+            self._reply(400, {"error": str(error)})
+            return
+        self._reply(200, {"action": int(actions[0])} if single else {"actions": actions.tolist()})
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # socketserver's default listen backlog of 5 resets bursts of new connections
+
+
+def make_server(model, model_name, host="127.0.0.1", port=8000, max_batch_size=256, max_delay=0.002):
+    """
+    Localhost HTTP server for the greedy actions of model.
+
+    Endpoints: POST /act with {"state": [...]} returns {"action": a}, with
+    {"states": [[...], ...]} returns {"actions": [...]}; GET /stats returns the
+    MicroBatcher stats; GET /healthz. Every connection is served by its own thread
+    and all of them share one MicroBatcher.
+
+    Args:
+        model: Trained model, e.g. from load_model.
+        model_name: Name reported by /stats.
+        host, port: Address to bind; port 0 picks a free port.
+        max_batch_size, max_delay: As in MicroBatcher.
+
+    Returns:
+        A ThreadingHTTPServer; call serve_forever, and server.batcher.close() after shutdown.
+    """
+    server = _Server((host, port), _Handler)
+    server.model_name = model_name
+    server.batcher = MicroBatcher(NumpyPolicy(model), max_batch_size, max_delay)
+    return server
+
+
+class PolicyClient:
+    def __init__(self, host="127.0.0.1", port=8000, timeout=10.0):
+        """Client of make_server's endpoints over one keep-alive connection; not thread-safe."""
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _request(self, method, path, body=None):
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        self.connection.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        response = self.connection.getresponse()
+        payload = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"{method} {path} failed with {response.status}: {payload.get('error')}")
+        return payload
+
+    def act(self, state):
+        """Greedy action for a single state."""
+        return self._request("POST", "/act", {"state": np.asarray(state).tolist()})["action"]
+
+    def act_batch(self, states):
+        """Greedy actions for a batch of states."""
+        return self._request("POST", "/act", {"states": np.asarray(states).tolist()})["actions"]
+
+    def stats(self):
+        return self._request("GET", "/stats")
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,127 @@
+import json
+import os
+
+import numpy as np
+
+
+class QSnapshotStore:
+    def __init__(self, directory, mode="r"):
+        """
+        Append-only archive of Q-table snapshots in a growable memory-mapped array.
+
+        The directory holds three files: meta.json (table shape and dtype), tables.bin
+        (all snapshots back to back) and index.bin (an int64 array whose first entry is
+        the number of snapshots, followed by the global step of each snapshot). Appending
+        is a memory copy into the mapping, and readers slice any step range without
+        loading the rest of the history. Storing as float32 or float16 halves or quarters
+        the size of float64 Q-tables.
+
+        Use QSnapshotStore.create to start a new archive and QSnapshotStore(directory) to
+        read one.
+
+        Args:
+            directory: Archive directory.
+            mode: "r" to read, "r+" to append to an existing archive.
+        """
+        self.directory = directory
+        self.mode = mode
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        self.shape = tuple(meta["shape"])
+        self.dtype = np.dtype(meta["dtype"])
+        self.every = meta["every"]
+        self._map()
+
+    @classmethod
+    def create(cls, directory, shape, dtype=np.float32, every=100, initial_capacity=64):
+        """
+        Start a new archive, replacing any existing one in directory.
+
+        Args:
+            directory: Archive directory.
+            shape: Shape of one Q-table.
+            dtype: Storage dtype of the snapshots.
+            every: Step interval used by maybe_append.
+            initial_capacity: Snapshots to allocate before the first resize.
+        """
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"shape": list(shape), "dtype": np.dtype(dtype).name, "every": every}, f)
+        table_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+        with open(os.path.join(directory, "tables.bin"), "wb") as f:
+            f.truncate(initial_capacity * table_bytes)
+        with open(os.path.join(directory, "index.bin"), "wb") as f:
+            f.truncate((initial_capacity + 1) * 8)
+        return cls(directory, mode="r+")
+
+    def _map(self):
+        index_path = os.path.join(self.directory, "index.bin")
+        self.capacity = os.path.getsize(index_path) // 8 - 1
+        self._index = np.memmap(index_path, dtype=np.int64, mode=self.mode)
+        self._tables = np.memmap(os.path.join(self.directory, "tables.bin"), dtype=self.dtype, mode=self.mode,
+                                 shape=(self.capacity, *self.shape))
+
+    def _grow(self):
+        self.flush()
+        capacity = 2 * self.capacity
+        table_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        del self._index, self._tables
+        with open(os.path.join(self.directory, "tables.bin"), "r+b") as f:
+            f.truncate(capacity * table_bytes)
+        with open(os.path.join(self.directory, "index.bin"), "r+b") as f:
+            f.truncate((capacity + 1) * 8)
+        self._map()
+
+    def __len__(self):
+        return int(self._index[0])
+
+    @property
+    def steps(self):
+        """Global step of every snapshot, in append order."""
+        return self._index[1:len(self) + 1]
+
+    @property
+    def tables(self):
+        """Memory-mapped view of all snapshots, shape [snapshots, *shape]."""
+        return self._tables[:len(self)]
+
+    def maybe_append(self, step, q_values):
+        """Append q_values if step is on the store's schedule."""
+        if step % self.every == 0:
+            self.append(step, q_values)
+
+    def append(self, step, q_values):
+        count = len(self)
+        if count == self.capacity:
+            self._grow()
+        self._tables[count] = q_values
+        self._index[count + 1] = step
+        self._index[0] = count + 1
+
+    def at(self, step):
+        """The last snapshot taken at or before step."""
+        i = np.searchsorted(self.steps, step, side="right") - 1
+        if i < 0:
+            raise KeyError(f"no snapshot at or before step {step}")
+        return self.tables[i]
+
+    def range(self, start, stop):
+        """Steps and memory-mapped tables of the snapshots with start <= step < stop."""
+        steps = self.steps
+        lo, hi = np.searchsorted(steps, start), np.searchsorted(steps, stop)
+        return steps[lo:hi], self.tables[lo:hi]
+
+    def flush(self):
+        if self.mode != "r":
+            self._tables.flush()
+            self._index.flush()
+
+    def close(self):
+        self.flush()
+        del self._index, self._tables
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,161 @@
+import json
+import multiprocessing as mp
+import itertools
+import os
+import queue
+import random
+import traceback
+import zlib
+
+import numpy as np
+
+_results = None
+_jobs = itertools.count()
+
+# imported once by the fork server, so that every worker forked from it starts with them loaded
+PRELOAD = ["numpy", "torch", "gymnasium", "drl.agents", "drl.ensemble", "drl.training", "drl.experiments"]
+
+
+def config_seed(config, base_seed=0):
+    """Seed derived from the config alone, so results don't depend on which worker runs it or when."""
+    return (zlib.crc32(json.dumps(config, sort_keys=True, default=str).encode()) + base_seed) % 2 ** 31
+
+
+def seed_everything(seed):
+    import torch
+
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+
+def _init_worker(results, threads_per_worker):
+    global _results
+    import torch
+
+    _results = results
+    torch.set_num_threads(threads_per_worker)
+    torch.set_num_interop_threads(1)
+
+
+def pool_context():
+    """
+    Multiprocessing context for sweep workers that start without re-importing torch and gymnasium.
+
+    Where available this is the forkserver start method: a server process imports PRELOAD
+    once and every worker is forked from it, which is much faster than a spawn worker
+    importing everything again. Elsewhere it falls back to spawn. Neither forks the
+    parent, so workers never inherit its torch thread pools.
+    """
+    if "forkserver" in mp.get_all_start_methods():
+        ctx = mp.get_context("forkserver")
+        ctx.set_forkserver_preload(PRELOAD)
+        return ctx
+    return mp.get_context("spawn")
+
+
+class WorkerResults:
+    def __init__(self, ctx):
+        """
+        Channel the sweep workers report their configs on, which notices workers that die mid-config.
+
+        A worker killed for running out of memory or by a segfault in torch never reports
+        back, and the pool silently replaces it. So workers announce every config before
+        running it on a SimpleQueue, whose put is written to the pipe at once (a Queue
+        hands it to a feeder thread that dies with the process), and next_result checks
+        that the announcing processes are still alive while it waits.
+
+        Args:
+            ctx: Multiprocessing context of the pool.
+        """
+        self.results = ctx.Queue()
+        self.started = ctx.SimpleQueue()
+        self.running = {}
+
+    def put(self, job, config, result, error):
+        self.results.put((job, config, result, error))
+
+    def _drain_started(self):
+        while not self.started.empty():
+            job, config = self.started.get()
+            self.running[job] = config
+
+    def next_result(self, poll=1.0):
+        """
+        Wait for the next finished config.
+
+        Args:
+            poll: Seconds between liveness checks of the workers with a config in progress.
+
+        Returns:
+            A tuple of (config, result, error), where error is a traceback string or None.
+
+        Raises:
+            RuntimeError: If a worker exited without returning the result of its config.
+        """
+        while True:
+            try:
+                job, config, result, error = self.results.get(timeout=poll)
+            except queue.Empty:
+                self._drain_started()
+                for (pid, _), config in self.running.items():
+                    if not _alive(pid):
+                        raise RuntimeError(f"worker {pid} exited without returning a result for config {config}, "
+                                           f"e.g. killed for running out of memory")
+                continue
+            # the announcement is in the pipe before the result, but may not have been read yet
+            self._drain_started()
+            self.running.pop(job, None)
+            return config, result, error
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def _run_config(run, config, seed):
+    job = (os.getpid(), next(_jobs))
+    _results.started.put((job, config))
+    seed_everything(seed)
+    try:
+        _results.put(job, config, run(config, seed), None)
+    except Exception:
+        _results.put(job, config, None, traceback.format_exc())
+
+
+def run_sweep(run, configs, workers=None, threads_per_worker=1, base_seed=0):
+    """
+    Run every config in a pool of worker processes and yield results as they finish.
+
+    Each worker pins torch to threads_per_worker intra-op threads so that the workers
+    together don't oversubscribe the cores. Results stream back through a queue in
+    completion order. See pool_context for how the workers are started. If a worker
+    dies mid-config, run_sweep raises instead of waiting forever, see WorkerResults.
+
+    Args:
+        run: Picklable function called as run(config, seed) in a worker.
+        configs: List of config dicts.
+        workers: Number of worker processes, defaults to cores // threads_per_worker.
+        threads_per_worker: torch intra-op threads per worker.
+        base_seed: Offset added to every per-config seed.
+
+    Yields:
+        (config, result) tuples in completion order.
+    """
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    ctx = pool_context()
+    results = WorkerResults(ctx)
+    with ctx.Pool(min(workers, len(configs)), initializer=_init_worker,
+                  initargs=(results, threads_per_worker)) as pool:
+        for config in configs:
+            pool.apply_async(_run_config, (run, config, config_seed(config, base_seed)),
+                             error_callback=lambda e, config=config: results.put(None, config, None, repr(e)))
+        for _ in configs:
+            config, result, error = results.next_result()
+            if error is not None:
+                raise RuntimeError(f"config {config} failed:\n{error}")
+            yield config, result
@@ -0,0 +1,179 @@
+import itertools
+import zlib
+
+import numpy as np
+
+from drl.frozen_lake import FrozenLakeModel
+from drl.profiling import NULL_TIMER
+
+
+class SparseQTable:
+    def __init__(self, n_states, n_actions, n_tables=1, initial_rows=64):
+        """
+        Q-tables of n_tables configs that only materialize the states some config visited.
+
+        A state's Q-values for all tables live in one [n_tables, n_actions] row of a
+        growing array, allocated the first time the state is written. Unvisited states
+        cost one int32 slot and read as the shared all-zero row 0, the value an
+        np.zeros table would hold for them.
+
+        Args:
+            n_states: Number of states.
+            n_actions: Number of actions.
+            n_tables: Number of Q-tables stored side by side.
+            initial_rows: Row capacity allocated up front, at most n_states + 1; it
+                doubles when full.
+        """
+        self.n_states = n_states
+        self.n_actions = n_actions
+        self.n_tables = n_tables
+        self.slots = np.zeros(n_states, dtype=np.int32)
+        self.rows = np.zeros((min(initial_rows, n_states + 1), n_tables, n_actions))
+        self.n_rows = 1  # row 0 is the zero row of the unvisited states
+
+    @property
+    def n_visited(self):
+        """Number of materialized states."""
+        return self.n_rows - 1
+
+    @property
+    def nbytes(self):
+        """Bytes allocated, including the row capacity not used yet."""
+        return self.slots.nbytes + self.rows.nbytes
+
+    @property
+    def dense_nbytes(self):
+        """Bytes of the equivalent dense [n_tables, n_states, n_actions] array."""
+        return self.n_tables * self.n_states * self.n_actions * self.rows.itemsize
+
+    def lookup(self, states):
+        """Row indices of states for reading; unvisited states map to the zero row."""
+        return self.slots[states]
+
+    def materialize(self, states):
+        """Row indices of states for writing, allocating rows for the unvisited ones."""
+        slots = self.slots[states]
+        if slots.all():
+            return slots
+        new = np.unique(states[slots == 0])
+        if self.n_rows + len(new) > len(self.rows):
+            capacity = min(max(2 * len(self.rows), self.n_rows + len(new)), self.n_states + 1)
+            rows = np.zeros((capacity, self.n_tables, self.n_actions))
+            rows[:self.n_rows] = self.rows[:self.n_rows]
+            self.rows = rows
+        self.slots[new] = np.arange(self.n_rows, self.n_rows + len(new))
+        self.n_rows += len(new)
+        return self.slots[states]
+
+    def to_dense(self):
+        """The Q-tables as a dense [n_tables, n_states, n_actions] array."""
+        return self.rows[self.slots].transpose(1, 0, 2).copy()
+
+
+def batched_q_learning(env, learning_rates, epsilon_decays, discount_factors, n_episodes=5000,
+                       start_epsilon=1.0, final_epsilon=0.0, step_limit=None, seed=None, sparse=False,
+                       timer=NULL_TIMER, configs=None):
+    """
+    Train one tabular Q-learning agent per hyperparameter combination, all in lockstep.
+
+    The Q-tables of all configs are one [configs, states, actions] array and every tick
+    advances all configs by one step: epsilon-greedy selection, environment transitions
+    (sampled from env's transition model), TD updates and epsilon decay are array
+    operations over the config axis. A config starts its next episode as soon as the
+    current one ends, so short episodes don't wait for long ones, and it is masked out
+    once it has played n_episodes.
+
+    Every config draws its random numbers from its own generator, seeded from seed and
+    the config's hyperparameters, so a config's result does not depend on which other
+    configs are trained alongside it.
+
+    The Q-tables are a SparseQTable, so memory grows with the states the configs visit
+    rather than with the map, e.g. on maps from generate_random_map up to 256x256.
+
+    Args:
+        env: Discrete toy-text env exposing its transition model as env.unwrapped.P,
+            see FrozenLakeModel.from_env, or a FrozenLakeModel such as
+            FrozenLakeModel.from_map of a large generated map.
+        learning_rates: Grid values for the learning rate.
+        epsilon_decays: Grid values for the linear epsilon decay per episode.
+        discount_factors: Grid values for the discount factor.
+        n_episodes: Episodes per config.
+        start_epsilon: Initial exploration rate.
+        final_epsilon: Lower bound of the exploration rate.
+        step_limit: Maximum steps per episode, default model.default_step_limit(), which
+            is 100 on the 4x4 map and grows with the map size.
+        seed: Seed of the per-config random generators.
+        sparse: Return the SparseQTable instead of dense Q-tables.
+        timer: PhaseTimer counting "env_steps" (steps of configs still training).
+        configs: (learning_rate, epsilon_decay, discount_factor) tuples to train instead of
+            the grid of the three value lists, e.g. the configs of a grid missing from
+            drl.results.RunStore.
+
+    Returns:
+        A tuple of (configs, avg_steps, q_values), where configs lists
+        (learning_rate, start_epsilon, epsilon_decay, discount_factor) tuples in the
+        order of optimize_hyperparameters, avg_steps is the average steps per episode of
+        each config (step_limit for episodes that did not reach the goal, like
+        train_agent) and q_values holds the final Q-tables, [configs, states, actions]
+        or a SparseQTable.
+    """
+    model = env if isinstance(env, FrozenLakeModel) else FrozenLakeModel.from_env(env)
+    n_actions = model.n_actions
+    if step_limit is None:
+        step_limit = model.default_step_limit()
+
+    if configs is None:
+        configs = itertools.product(learning_rates, epsilon_decays, discount_factors)
+    configs = [(lr, start_epsilon, ed, df) for lr, ed, df in configs]
+    lr, _, epsilon_decay, discount = (np.array(column, dtype=np.float64) for column in zip(*configs))
+    n_configs = len(configs)
+    config_index = np.arange(n_configs)
+    entropy = np.random.SeedSequence(seed).entropy
+    rngs = [np.random.default_rng([entropy, zlib.crc32(repr(config).encode())]) for config in configs]
+
+    q_table = SparseQTable(model.n_states, n_actions, n_configs)
+    epsilon = np.full(n_configs, float(start_epsilon))
+    total_steps = np.zeros(n_configs)
+
+    episodes = np.zeros(n_configs, dtype=np.int64)
+    states = model.initial_states(np.array([rng.random() for rng in rngs]))
+    steps = np.zeros(n_configs, dtype=np.int64)
+    active = np.ones(n_configs, dtype=bool)
+    block = 1024
+    t = block
+    while active.any():
+        if t == block:
+            # draw random numbers for a block of ticks at once
+            # one [4, block] draw per config: exploration, random action, transition and reset uniforms
+            draws = np.stack([rng.random((4, block)) for rng in rngs], axis=2)
+            explore_draws, action_draws, transition_draws, reset_draws = draws
+            random_actions = (action_draws * n_actions).astype(np.int64)
+            uniforms = transition_draws[..., None]
+            t = 0
+
+        state_rows = q_table.materialize(states)
+        q_state = q_table.rows[state_rows, config_index]
+        actions = np.where(explore_draws[t] < epsilon, random_actions[t], q_state.argmax(axis=1))
+
+        next_states, rewards, terminated = model.step(states, actions, uniforms[t])
+        resets = reset_draws[t]
+        t += 1
+
+        future_q_values = ~terminated * q_table.rows[q_table.lookup(next_states), config_index].max(axis=1)
+        temporal_difference = rewards + discount * future_q_values - q_state[config_index, actions]
+        q_table.rows[state_rows, config_index, actions] += active * lr * temporal_difference
+        timer.count("env_steps", int(active.sum()))
+
+        steps += 1
+        ended = terminated | (steps >= step_limit)
+        states = next_states
+        if ended.any():
+            states = np.where(ended, model.initial_states(resets), states)
+            finished = ended & active
+            total_steps += finished * np.where(rewards > 0, steps, step_limit)
+            epsilon = np.where(finished, np.maximum(final_epsilon, epsilon - epsilon_decay), epsilon)
+            episodes += finished
+            steps[ended] = 0
+            active &= episodes < n_episodes
+
+    return configs, total_steps / n_episodes, q_table if sparse else q_table.to_dense()
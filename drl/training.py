@@ -0,0 +1,281 @@
+import numpy as np
+
+from drl.evaluation import BatchedEvaluator
+from drl.metrics import NullMetrics
+from drl.profiling import NULL_TIMER
+from drl.schedule import UpdateSchedule
+
+
+def _episode_record(reward, episode_losses):
+    """Metrics of a finished episode; Loss is left out when no gradient step ran since the last one finished."""
+    record = {"Reward": reward}
+    if episode_losses:
+        record["Loss"] = np.mean(episode_losses)
+    return record
+
+
+# write a test function to test the agent, this function will be called while training the agent
+def test_agent(env, agent, episodes=100):
+    rewards = []
+    for episode in range(episodes):
+        state, _ = env.reset()
+        total_reward = 0
+        for t in range(500):
+            action = agent.test_action(state)
+            next_state, reward, done, truncated, _ = env.step(action)
+            state = next_state
+            total_reward += reward
+            if done:
+                break
+        rewards.append(total_reward)
+    return rewards
+
+
+# Training Function
+def train_agent(env, agent, episodes, batch_size, target_update_every, metrics=None, timer=NULL_TIMER,
+                profiler=None, schedule=None, checkpointer=None, evaluator=None):
+    metrics = metrics if metrics is not None else NullMetrics()
+    evaluator = evaluator if evaluator is not None else BatchedEvaluator(env.spec.id)
+    schedule = schedule if schedule is not None else UpdateSchedule()
+    agent.timer = timer
+    rewards = []
+    losses = []
+    first_time_passed = 8000
+    env_steps = 0
+    gradient_steps = 0
+    start_episode = 0
+    if checkpointer is not None and (loop_state := checkpointer.restore(agent)) is not None:
+        start_episode = loop_state["episode"] + 1
+        rewards, losses = loop_state["rewards"], loop_state["losses"]
+        first_time_passed = loop_state["first_time_passed"]
+        env_steps, gradient_steps = loop_state["env_steps"], loop_state["gradient_steps"]
+
+    for episode in range(start_episode, episodes):
+        state, _ = env.reset()
+        total_reward = 0
+        episode_losses = []
+        done = False
+        truncated = False
+        while not (done or truncated):
+            with timer.phase("act"):
+                action = agent.sample_action(state)
+            with timer.phase("env_step"):
+                next_state, reward, done, truncated, _ = env.step(action)
+            timer.count("env_steps")
+            with timer.phase("store"):
+                agent.store_experience((state, action, reward, next_state, done), truncated)
+            state = next_state
+            total_reward += reward
+            if profiler is not None:
+                profiler.step()
+            env_steps += 1
+
+            for _ in range(schedule.updates_due(env_steps, len(agent.replay_memory), batch_size)):
+                loss = agent.train_on_batch(batch_size)
+                if loss is not None:
+                    episode_losses.append(loss)
+                gradient_steps += 1
+                if schedule.sync_due(gradient_steps):
+                    agent.update_target_model()
+
+        agent.decay_epsilon()
+        rewards.append(total_reward)
+        losses.extend(episode_losses)
+
+        if schedule.sync_episode_due(episode, target_update_every):
+            agent.update_target_model()
+
+        if episode % 50 == 0:
+            agent.model.eval()
+            with timer.phase("evaluate"):
+                test_rewards = evaluator(agent)
+            metrics.log({"test_reward": np.mean(test_rewards), "eval_episodes": len(test_rewards),
+                         "env_steps": env_steps, "gradient_steps": gradient_steps}, episode=episode)
+            if (np.mean(test_rewards) > 475) and (first_time_passed == 8000):
+                first_time_passed = episode
+            agent.model.train()
+
+
+        metrics.log(_episode_record(total_reward, episode_losses), episode=episode)
+        if checkpointer is not None:
+            checkpointer.maybe_save(agent, episode, episode == episodes - 1, rewards=rewards, losses=losses,
+                                    first_time_passed=first_time_passed, env_steps=env_steps,
+                                    gradient_steps=gradient_steps)
+
+    return rewards, losses, first_time_passed
+
+
+def make_vector_env(num_envs, asynchronous=False):
+    """CartPole copies stepped together, in subprocesses when asynchronous is set."""
+    import gymnasium as gym
+
+    return gym.make_vec("CartPole-v1", num_envs=num_envs, vectorization_mode="async" if asynchronous else "sync")
+
+
+_PENDING_COLUMNS = ("pending_states", "pending_actions", "pending_rewards", "pending_next_states", "pending_dones")
+
+
+# Training Function for a vector env, e.g. make_vector_env(8, asynchronous=True)
+# Checkpoints hold the open n-step windows of every env, cut short at the env's current state, and a resumed
+# run adds them to the replay buffer; the episodes still in progress at the checkpoint start over.
+def train_agent_vec(envs, agent, episodes, batch_size, target_update_every, metrics=None, timer=NULL_TIMER,
+                    profiler=None, schedule=None, checkpointer=None, evaluator=None):
+    metrics = metrics if metrics is not None else NullMetrics()
+    evaluator = evaluator if evaluator is not None else BatchedEvaluator(envs.spec.id)
+    schedule = schedule if schedule is not None else UpdateSchedule()
+    agent.timer = timer
+    rewards = []
+    losses = []
+    first_time_passed = 8000
+    env_steps = 0
+    gradient_steps = 0
+    start_episode = 0
+    if checkpointer is not None and (loop_state := checkpointer.restore(agent)) is not None:
+        start_episode = loop_state["episode"] + 1
+        rewards, losses = loop_state["rewards"], loop_state["losses"]
+        first_time_passed = loop_state["first_time_passed"]
+        env_steps, gradient_steps = loop_state["env_steps"], loop_state["gradient_steps"]
+        if loop_state.get("pending_actions"):
+            agent.replay_memory.extend(*(np.asarray(loop_state[key], dtype=dtype) for key, dtype in
+                                         zip(_PENDING_COLUMNS, (np.float32, np.int64, np.float32, np.float32,
+                                                                np.float32))))
+
+    states, _ = envs.reset()
+    total_rewards = np.zeros(envs.num_envs)
+    episode_losses = []
+    # with next-step autoreset, the step after an episode ends only resets that env
+    autoreset = np.zeros(envs.num_envs, dtype=bool)
+    episode = start_episode
+    while episode < episodes:
+        with timer.phase("act"):
+            actions = agent.sample_actions(states)
+        with timer.phase("env_step"):
+            next_states, step_rewards, dones, truncateds, _ = envs.step(actions)
+        live = ~autoreset
+        new_steps = int(live.sum())
+        env_steps += new_steps
+        timer.count("env_steps", new_steps)
+        with timer.phase("store"):
+            agent.store_experiences(states[live], actions[live], step_rewards[live], next_states[live], dones[live],
+                                    truncateds[live], np.flatnonzero(live))
+        if profiler is not None:
+            profiler.step()
+        total_rewards[live] += step_rewards[live]
+        states = next_states
+
+        for _ in range(schedule.updates_due(env_steps, len(agent.replay_memory), batch_size, new_steps)):
+            loss = agent.train_on_batch(batch_size)
+            if loss is not None:
+                episode_losses.append(loss)
+            gradient_steps += 1
+            if schedule.sync_due(gradient_steps):
+                agent.update_target_model()
+
+        autoreset = dones | truncateds
+        for i in np.flatnonzero(autoreset):
+            if episode == episodes:
+                break
+            agent.decay_epsilon()
+            rewards.append(total_rewards[i])
+            losses.extend(episode_losses)
+
+            if schedule.sync_episode_due(episode, target_update_every):
+                agent.update_target_model()
+
+            if episode % 50 == 0:
+                agent.model.eval()
+                with timer.phase("evaluate"):
+                    test_rewards = evaluator(agent)
+                metrics.log({"test_reward": np.mean(test_rewards), "eval_episodes": len(test_rewards),
+                             "env_steps": env_steps, "gradient_steps": gradient_steps}, episode=episode)
+                if (np.mean(test_rewards) > 475) and (first_time_passed == 8000):
+                    first_time_passed = episode
+                agent.model.train()
+
+            metrics.log(_episode_record(total_rewards[i], episode_losses), episode=episode)
+            if checkpointer is not None:
+                checkpointer.maybe_save(agent, episode, episode == episodes - 1, rewards=rewards, losses=losses,
+                                        first_time_passed=first_time_passed, env_steps=env_steps,
+                                        gradient_steps=gradient_steps,
+                                        **dict(zip(_PENDING_COLUMNS, agent.pending_transitions(states))))
+            total_rewards[i] = 0
+            episode_losses = []
+            episode += 1
+
+    return rewards, losses, first_time_passed
+
+
+# Training Function with prioritized replay and importance sampling
+def train_agentIS(env, agent, episodes, batch_size, target_update_every, metrics=None, timer=NULL_TIMER,
+                  profiler=None, schedule=None, checkpointer=None, evaluator=None):
+    metrics = metrics if metrics is not None else NullMetrics()
+    evaluator = evaluator if evaluator is not None else BatchedEvaluator(env.spec.id)
+    schedule = schedule if schedule is not None else UpdateSchedule()
+    agent.timer = timer
+    env_steps = 0
+    gradient_steps = 0
+    rewards = []
+    losses = []
+    first_time_passed = 8000
+    start_episode = 0
+    if checkpointer is not None and (loop_state := checkpointer.restore(agent)) is not None:
+        start_episode = loop_state["episode"] + 1
+        rewards, losses = loop_state["rewards"], loop_state["losses"]
+        first_time_passed = loop_state["first_time_passed"]
+        env_steps, gradient_steps = loop_state["env_steps"], loop_state["gradient_steps"]
+
+    for episode in range(start_episode, episodes):
+        state, _ = env.reset()
+        total_reward = 0
+        episode_losses = []
+
+        for t in range(500):
+            with timer.phase("act"):
+                action = agent.sample_action(state)
+            with timer.phase("env_step"):
+                next_state, reward, done, truncated, _ = env.step(action)
+            timer.count("env_steps")
+            td_error = abs(reward)  # Initial priority for new experiences
+            with timer.phase("store"):
+                agent.store_experience((state, action, reward, next_state, done), td_error, truncated)
+            state = next_state
+            total_reward += reward
+            if profiler is not None:
+                profiler.step()
+            env_steps += 1
+
+            for _ in range(schedule.updates_due(env_steps, len(agent.replay_buffer), batch_size)):
+                loss = agent.train_on_batch(batch_size)
+                if loss is not None:
+                    episode_losses.append(loss)
+                gradient_steps += 1
+                if schedule.sync_due(gradient_steps):
+                    agent.update_target_model()
+
+            if done:
+                break
+
+        agent.decay_epsilon()
+        rewards.append(total_reward)
+        losses.extend(episode_losses)
+
+        if schedule.sync_episode_due(episode, target_update_every):
+            agent.update_target_model()
+
+        if episode % 50 == 0:
+            agent.model.eval()
+            with timer.phase("evaluate"):
+                test_rewards = evaluator(agent)
+            metrics.log({"test_reward": np.mean(test_rewards), "eval_episodes": len(test_rewards),
+                         "env_steps": env_steps, "gradient_steps": gradient_steps}, episode=episode)
+            if (np.mean(test_rewards) > 475) and (first_time_passed == 8000):
+                first_time_passed = episode
+            agent.model.train()
+
+        metrics.log(_episode_record(total_reward, episode_losses), episode=episode)
+        if checkpointer is not None:
+            checkpointer.maybe_save(agent, episode, episode == episodes - 1, rewards=rewards, losses=losses,
+                                    first_time_passed=first_time_passed, env_steps=env_steps,
+                                    gradient_steps=gradient_steps)
+
+    return rewards, losses, first_time_passed